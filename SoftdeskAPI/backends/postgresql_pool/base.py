@@ -0,0 +1,58 @@
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+
+try:
+    from psycopg_pool import ConnectionPool
+except ImportError:
+    ConnectionPool = None
+
+# Django's PostgreSQL backend, with the connections taken from a psycopg_pool pool of
+# the process instead of opened and closed by each request (Django 5.0 has no pool of
+# its own). OPTIONS['pool'] holds the pool's min_size, max_size and timeout. Requires
+# psycopg 3 and psycopg_pool (pip install "psycopg[binary,pool]"), and CONN_MAX_AGE = 0:
+# a request gives its connection back to the pool when it ends.
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # {alias: pool}
+    pools = {}
+    pools_lock = threading.Lock()
+
+    @property
+    def pool(self):
+        with self.pools_lock:
+            if self.alias not in self.pools:
+                if ConnectionPool is None or not base.is_psycopg3:
+                    raise ImproperlyConfigured("The pooled PostgreSQL backend requires psycopg 3 and psycopg_pool")
+                if self.settings_dict['CONN_MAX_AGE']:
+                    raise ImproperlyConfigured("The pooled PostgreSQL backend requires CONN_MAX_AGE = 0")
+                options = {'min_size': 2, 'max_size': 10, 'timeout': 10,
+                           **self.settings_dict['OPTIONS'].get('pool', {})}
+                self.pools[self.alias] = ConnectionPool(
+                    kwargs=self.get_connection_params(),
+                    # replaces CONN_HEALTH_CHECKS: checked when taken from the pool
+                    check=ConnectionPool.check_connection if self.settings_dict['CONN_HEALTH_CHECKS'] else None,
+                    open=True,
+                    **options,
+                )
+            return self.pools[self.alias]
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = self.pool.getconn()
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        self.isolation_level = base.IsolationLevel(isolation_level or base.IsolationLevel.READ_COMMITTED)
+        if isolation_level is not None:
+            connection.isolation_level = self.isolation_level
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.putconn(self.connection)
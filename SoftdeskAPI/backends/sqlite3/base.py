@@ -0,0 +1,18 @@
+from django.db.backends.sqlite3 import base
+
+# Django's SQLite backend, with the PRAGMAs of OPTIONS['pragmas'] run on every new
+# connection, e.g. {'journal_mode': 'WAL', 'synchronous': 'NORMAL'}: readers no longer
+# wait for the writer, and commits no longer wait for a full fsync.
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.settings_dict['OPTIONS'].get('pragmas', {}).items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
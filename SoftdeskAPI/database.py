@@ -0,0 +1,76 @@
+from pathlib import Path
+
+# DATABASES['default'] from the SOFTDESK_DB_* environment variables:
+#
+#   SOFTDESK_DB_ENGINE            sqlite (default), postgresql or postgresql-pool
+#   SOFTDESK_DB_NAME              SQLite file (default db.sqlite3) or PostgreSQL database (softdesk)
+#   SOFTDESK_DB_USER, SOFTDESK_DB_PASSWORD, SOFTDESK_DB_HOST, SOFTDESK_DB_PORT
+#   SOFTDESK_DB_CONN_MAX_AGE      seconds a connection is kept between requests
+#                                 (default 60 for postgresql, 0 otherwise)
+#   SOFTDESK_DB_HEALTH_CHECKS     1 (default) or 0, check a kept connection before reusing it
+#   SOFTDESK_DB_POOL_MIN_SIZE, SOFTDESK_DB_POOL_MAX_SIZE, SOFTDESK_DB_POOL_TIMEOUT
+#                                 postgresql-pool only, defaults 2, 10 and 10 seconds
+#   SOFTDESK_SQLITE_JOURNAL_MODE  default WAL (DELETE is SQLite's own default)
+#   SOFTDESK_SQLITE_SYNCHRONOUS   default NORMAL (FULL is SQLite's own default)
+#   SOFTDESK_SQLITE_BUSY_TIMEOUT  milliseconds a connection waits for a lock, default 5000
+#   SOFTDESK_DB_REPLICAS          comma separated read replicas, SQLite files or PostgreSQL
+#                                 host[:port]s, otherwise configured like the primary
+
+ENGINES = {
+    'sqlite': 'SoftdeskAPI.backends.sqlite3',
+    'postgresql': 'django.db.backends.postgresql',
+    'postgresql-pool': 'SoftdeskAPI.backends.postgresql_pool',
+}
+
+
+def from_environ(environ, base_dir):
+    engine = environ.get('SOFTDESK_DB_ENGINE', 'sqlite')
+    if engine not in ENGINES:
+        raise ValueError(f"SOFTDESK_DB_ENGINE must be one of {', '.join(ENGINES)}, not {engine!r}")
+
+    database = {
+        'ENGINE': ENGINES[engine],
+        'CONN_MAX_AGE': int(environ.get('SOFTDESK_DB_CONN_MAX_AGE', 60 if engine == 'postgresql' else 0)),
+        'CONN_HEALTH_CHECKS': environ.get('SOFTDESK_DB_HEALTH_CHECKS', '1') == '1',
+    }
+    if engine == 'sqlite':
+        return {
+            **database,
+            'NAME': environ.get('SOFTDESK_DB_NAME', Path(base_dir) / 'db.sqlite3'),
+            'OPTIONS': {
+                'timeout': int(environ.get('SOFTDESK_SQLITE_BUSY_TIMEOUT', 5000)) / 1000,
+                'pragmas': {
+                    'journal_mode': environ.get('SOFTDESK_SQLITE_JOURNAL_MODE', 'WAL'),
+                    'synchronous': environ.get('SOFTDESK_SQLITE_SYNCHRONOUS', 'NORMAL'),
+                },
+            },
+        }
+
+    database.update({
+        'NAME': environ.get('SOFTDESK_DB_NAME', 'softdesk'),
+        'USER': environ.get('SOFTDESK_DB_USER', ''),
+        'PASSWORD': environ.get('SOFTDESK_DB_PASSWORD', ''),
+        'HOST': environ.get('SOFTDESK_DB_HOST', ''),
+        'PORT': environ.get('SOFTDESK_DB_PORT', ''),
+        'OPTIONS': {},
+    })
+    if engine == 'postgresql-pool':
+        database['OPTIONS']['pool'] = {
+            'min_size': int(environ.get('SOFTDESK_DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(environ.get('SOFTDESK_DB_POOL_MAX_SIZE', 10)),
+            'timeout': int(environ.get('SOFTDESK_DB_POOL_TIMEOUT', 10)),
+        }
+    return database
+
+
+def replicas_from_environ(environ, primary):
+    # {'replica1': {...}, ...}, read by the tests through the primary's test database
+    replicas = {}
+    for number, replica in enumerate(filter(None, environ.get('SOFTDESK_DB_REPLICAS', '').split(',')), 1):
+        if primary['ENGINE'] == ENGINES['sqlite']:
+            location = {'NAME': replica.strip()}
+        else:
+            host, _, port = replica.strip().partition(':')
+            location = {'HOST': host, 'PORT': port or primary['PORT']}
+        replicas[f'replica{number}'] = {**primary, **location, 'TEST': {'MIRROR': 'default'}}
+    return replicas
@@ -11,8 +11,11 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
 import datetime
+import os
 from pathlib import Path
 
+from SoftdeskAPI import database
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -42,7 +45,7 @@ INSTALLED_APPS = [
     'drf_yasg',
     'rest_framework',
     'rest_framework_simplejwt',
-    # 'rest_framework_simplejwt.token_blacklist',
+    'rest_framework_simplejwt.token_blacklist',
 
     'accounts',
     'softdesk',
@@ -66,16 +69,90 @@ SIMPLE_JWT = {
     "UPDATE_LAST_LOGIN": False,
     "ALGORITHM": "HS256",
     "AUTH_HEADER_TYPES": ("Bearer",),
+    # adds the claims TokenClaimsAuthentication builds request.user from
+    "TOKEN_OBTAIN_SERIALIZER": "accounts.serializers.MyTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "accounts.serializers.IndexedTokenRefreshSerializer",
 }
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # request.user from the token claims, without loading the user row
+        'accounts.authentication.TokenClaimsAuthentication',
         # 'rest_framework.authentication.SessionAuthentication',
     ),
+    # orjson when installed, DRF's json otherwise
+    'DEFAULT_RENDERER_CLASSES': (
+        'softdesk.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'softdesk.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    # a write by the token of a deleted user is a 401, not an IntegrityError
+    'EXCEPTION_HANDLER': 'accounts.authentication.token_exception_handler',
+}
+
+# 'page' or 'cursor': how the issues of a project and the comments of an issue are
+# paginated when the request does not pass ?pagination=
+SOFTDESK_PAGINATION_MODE = 'page'
+
+# list pages built from values() rows instead of serializer instances (same output),
+# requests with ?fields= or ?expand= always go through the serializers
+SOFTDESK_SERIALIZER_FAST_PATH = True
+
+# seconds the project ids a user contributes to are kept in the shared cache,
+# 0 loads them once per request only
+SOFTDESK_MEMBERSHIP_CACHE_TIMEOUT = 0
+
+# seconds between two reads of the tokens revoked by the other processes (the ones
+# revoked in this process are refused at once), 0 reads them at every request; each read
+# goes back MARGIN ids for the rows committed out of order, and every RELOAD seconds the
+# whole index is read again
+SOFTDESK_REVOCATION = {
+    'REFRESH': 5,
+    'MARGIN': 1000,
+    'RELOAD': 300,
+}
+
+# password hashing of signups and logins runs on WORKERS threads (0: inline), requests
+# beyond MAX_PENDING hashes in progress get a 429; ITERATIONS is the PBKDF2 cost
+# (None: Django's default), existing hashes are upgraded to it at the next login
+SOFTDESK_PASSWORD_HASHING = {
+    'WORKERS': 2,
+    'MAX_PENDING': 16,
+    'ITERATIONS': None,
+}
+
+# request.user is built from the token claims; the profile endpoint reads the full row,
+# kept for TIMEOUT seconds in a per-process LRU of SIZE users (0 reads it every time)
+SOFTDESK_HYDRATED_USERS = {
+    'SIZE': 256,
+    'TIMEOUT': 60,
+}
+
+# per request query count, database, serializer, view and total time as Server-Timing
+# headers and softdesk.timing log lines; each process adds its per-route histograms to the
+# ALIAS cache every FLUSH seconds for `python manage.py timing_report`
+SOFTDESK_TIMING = {
+    'ENABLED': False,
+    'ALIAS': 'default',
+    'FLUSH': 10,
+}
+
+# cache of the project list and project detail responses: ALIAS is any entry of
+# CACHES (None disables it), TIMEOUT is in seconds
+SOFTDESK_RESPONSE_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': 300,
 }
 
 MIDDLEWARE = [
+    # does nothing unless SOFTDESK_TIMING['ENABLED']
+    'softdesk.timing.TimingMiddleware',
+    # does nothing without read replicas
+    'softdesk.replicas.ReadYourWritesMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -109,16 +186,62 @@ WSGI_APPLICATION = 'SoftdeskAPI.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# configured by the SOFTDESK_DB_* environment variables, see SoftdeskAPI/database.py;
+# SQLite in WAL mode by default
 DATABASES = {
+    'default': database.from_environ(os.environ, BASE_DIR),
+}
+DATABASES.update(database.replicas_from_environ(os.environ, DATABASES['default']))
+
+# the GETs of the read endpoints go to the replicas, see softdesk/replicas.py
+DATABASE_ROUTERS = ['softdesk.replicas.ReplicaRouter']
+
+# databases of SOFTDESK_DB_REPLICAS that the read endpoints query, except for a user who
+# wrote something in the last PIN_SECONDS (read-your-writes); the pins are kept in the
+# CACHE entry of CACHES, which must be shared by every worker (system check softdesk.E001)
+SOFTDESK_READ_REPLICAS = {
+    'ALIASES': [alias for alias in DATABASES if alias != 'default'],
+    'PIN_SECONDS': 5,
+    'CACHE': 'default',
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+# the JSON lines of softdesk.timing.TimingMiddleware go to the console
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'softdesk.timing': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 
 AUTH_USER_MODEL = "accounts.User"
 
+# checks login passwords on the hashing pool of SOFTDESK_PASSWORD_HASHING
+AUTHENTICATION_BACKENDS = ['accounts.backends.PooledHashingBackend']
+
+# Django's hashers, with PBKDF2 at the cost of SOFTDESK_PASSWORD_HASHING['ITERATIONS']
+PASSWORD_HASHERS = [
+    'accounts.hashing.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
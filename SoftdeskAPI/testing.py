@@ -0,0 +1,51 @@
+import os
+import sys
+import time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Test helpers shared by the apps' test modules: the query budget suite runs every
+# endpoint of accounts/urls.py and softdesk/urls.py with BUDGET_SCALES seeded rows.
+
+# rows seeded for each scale of the query budget suite
+BUDGET_SCALES = (10, 100, 1000)
+
+# (endpoint, query count, wall time in seconds) for every budgeted request of the run
+BUDGET_RESULTS = []
+
+
+class QueryBudgetMixin:
+    # maximum number of SQL queries allowed per endpoint, whatever the amount of seeded rows
+    query_budgets = {}
+    rows = None
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        # SOFTDESK_BUDGET_REPORT=1 python manage.py test prints what each endpoint cost
+        if os.environ.get('SOFTDESK_BUDGET_REPORT'):
+            for name, queries, elapsed in BUDGET_RESULTS:
+                if name.startswith(f'{cls.__name__}:'):
+                    sys.stderr.write(f'\n{name:<60} {queries:>3} queries {elapsed * 1000:8.2f} ms')
+
+    def request_within_budget(self, endpoint, method, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            if method == 'get':
+                response = self.client.get(url)
+            else:
+                response = getattr(self.client, method)(url, data, format='json')
+            if response.streaming:
+                # streamed bodies run their queries while they are consumed
+                response.streamed_content = b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - start
+
+        BUDGET_RESULTS.append((f'{type(self).__name__}:{endpoint}', len(queries), elapsed))
+        self.assertLessEqual(
+            len(queries), self.query_budgets[endpoint],
+            f"{endpoint} ran {len(queries)} queries with {self.rows} rows seeded "
+            f"(budget {self.query_budgets[endpoint]}):\n"
+            + "\n".join(query['sql'] for query in queries.captured_queries)
+        )
+        return response
@@ -0,0 +1,133 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import IntegrityError, router
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from . import revocation
+from .models import User
+
+# Stateless JWT authentication: the access tokens issued by MyTokenObtainPairSerializer
+# carry the user's id and username, so request.user is built from the token instead of
+# loading the user row on every request. The token user is a User instance whose other
+# fields are deferred, which is all the contributor checks, filters and foreign keys
+# need. The staff flag is not trusted from the token, a demoted user would keep admin
+# access until it expires: it stays deferred, and the admin-only checks that read it load
+# it from the row. hydrate() returns the full row where it is needed (the profile), from
+# a small per-process LRU when SOFTDESK_HYDRATED_USERS['SIZE'] is set. Revoked tokens are
+# refused, see revocation.py. The token of a deleted user still authenticates until it
+# expires, but the rows its writes point at the user fail their foreign key:
+# token_exception_handler answers those with a 401 instead of a server error.
+
+CLAIMS = ('username',)
+
+
+def add_claims(token, user):
+    for claim in CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+def token_user(validated_token):
+    # a deactivated user keeps its access until the token expires, a deleted one its read access
+    values = {
+        'id': validated_token[api_settings.USER_ID_CLAIM],
+        'username': validated_token['username'],
+        'is_active': True,
+    }
+    return User.from_db(router.db_for_read(User), list(values), list(values.values()))
+
+
+def is_token_user(user):
+    return isinstance(user, User) and bool(user.get_deferred_fields())
+
+
+def check_revocation(validated_token, refresh=True):
+    if revocation.is_revoked(validated_token, refresh):
+        raise InvalidToken("Token is blacklisted")
+
+
+class TokenClaimsAuthentication(JWTAuthentication):
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        check_revocation(validated_token)
+        return validated_token
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken("Token contained no recognizable user identification")
+        if any(claim not in validated_token for claim in CLAIMS):
+            # issued before the claims were added, load the user the usual way
+            return super().get_user(validated_token)
+        return token_user(validated_token)
+
+
+def token_exception_handler(exc, context):
+    # the EXCEPTION_HANDLER of REST_FRAMEWORK; the user row is only looked up after a failed write
+    # (rest_framework.views imports the authentication classes, this module among them)
+    from rest_framework.views import exception_handler
+
+    request = context['request']
+    if isinstance(exc, IntegrityError) and is_token_user(request.user):
+        if not User.objects.filter(id=request.user.id).exists():
+            exc = AuthenticationFailed("User not found", code="user_not_found")
+            exc.auth_header = context['view'].get_authenticate_header(request)
+    return exception_handler(exc, context)
+
+
+class HydratedUsers:
+    # {user id: (loaded at, user)}, least recently used first
+    def __init__(self):
+        self.users = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, user_id, size, timeout):
+        with self.lock:
+            entry = self.users.get(user_id)
+            if entry is not None and time.monotonic() - entry[0] < timeout:
+                self.users.move_to_end(user_id)
+                return copy.copy(entry[1])
+
+        user = User.objects.get(id=user_id)
+        with self.lock:
+            self.users[user_id] = (time.monotonic(), copy.copy(user))
+            self.users.move_to_end(user_id)
+            while len(self.users) > size:
+                self.users.popitem(last=False)
+        return user
+
+    def forget(self, user_id):
+        with self.lock:
+            self.users.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.users.clear()
+
+
+hydrated_users = HydratedUsers()
+
+
+def hydrate(user, fresh=False):
+    # the full User row behind a token user; fresh=True always reads it, before a write
+    if not is_token_user(user):
+        return user
+    options = {'SIZE': 0, 'TIMEOUT': 60, **getattr(settings, 'SOFTDESK_HYDRATED_USERS', {})}
+    try:
+        if fresh or not options['SIZE']:
+            return User.objects.get(id=user.id)
+        return hydrated_users.get(user.id, options['SIZE'], options['TIMEOUT'])
+    except User.DoesNotExist:
+        raise AuthenticationFailed("User not found", code="user_not_found")
+
+
+@receiver([post_save, post_delete], sender=User)
+def forget_hydrated_user(sender, instance, **kwargs):
+    hydrated_users.forget(instance.id)
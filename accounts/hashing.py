@@ -0,0 +1,83 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework.exceptions import Throttled
+
+# Password hashing (signup) and checking (login) run on a small thread pool instead of
+# all at once in the request workers. PBKDF2 releases the GIL, so WORKERS hashes run in
+# parallel while a signup or login burst can use no more than WORKERS cores; past
+# MAX_PENDING hashes running or waiting, requests get a 429 instead of queueing.
+# WORKERS = 0 hashes inline, as Django does.
+#
+# The request thread still waits for its hash: a WSGI worker stays busy for the whole
+# PBKDF2 time. What the pool bounds is the CPU a burst takes from the other requests of
+# the process, and the number of them left waiting.
+
+
+def get_settings():
+    return {'WORKERS': 2, 'MAX_PENDING': 16, 'ITERATIONS': None,
+            **getattr(settings, 'SOFTDESK_PASSWORD_HASHING', {})}
+
+
+class HashingPool:
+    def __init__(self, workers, max_pending):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hashing')
+        self.slots = threading.BoundedSemaphore(max_pending)
+
+    def run(self, func, *args):
+        if not self.slots.acquire(blocking=False):
+            raise Throttled(wait=1, detail="Too many sign-ups and logins in progress, retry shortly.")
+        try:
+            future = self.executor.submit(func, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future.result()
+
+
+# one pool per (WORKERS, MAX_PENDING), so that a settings change takes effect
+pools = {}
+pools_lock = threading.Lock()
+
+
+def run(func, *args):
+    options = get_settings()
+    if not options['WORKERS']:
+        return func(*args)
+    key = (options['WORKERS'], options['MAX_PENDING'])
+    with pools_lock:
+        if key not in pools:
+            pools[key] = HashingPool(*key)
+    return pools[key].run(func, *args)
+
+
+def make_password(password):
+    return run(hashers.make_password, password)
+
+
+def check_password(user, password):
+    # hashers.check_password, except that an outdated hash is upgraded from this thread,
+    # the request's, which owns the database connection
+    if not run(hashers.check_password, password, user.password):
+        return False
+    hasher = hashers.identify_hasher(user.password)
+    preferred = hashers.get_hasher()
+    if hasher.algorithm != preferred.algorithm or preferred.must_update(user.password):
+        try:
+            user.password = make_password(password)
+        except Throttled:
+            # the password is right, the upgrade waits for a login on a quieter pool
+            return True
+        user.save(update_fields=['password'])
+    return True
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    # Django's PBKDF2 with the cost of SOFTDESK_PASSWORD_HASHING['ITERATIONS'], if set;
+    # existing hashes of another cost still verify, and are upgraded at the next login
+    @property
+    def iterations(self):
+        return get_settings()['ITERATIONS'] or hashers.PBKDF2PasswordHasher.iterations
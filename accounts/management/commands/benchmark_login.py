@@ -0,0 +1,59 @@
+import json
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from accounts import hashing
+from softdesk.management.commands import benchmark
+
+# A login burst next to project list reads, once per hashing setup: WORKERS=0 hashes
+# inline in the request threads, as before, the others on the bounded pool. Uses the
+# generate_data users, whose password is hashed at the cost of their generation.
+
+
+class Command(BaseCommand):
+    help = "Benchmark login throughput under concurrency, inline and on the hashing pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, nargs='+', default=[0, 2, 4],
+                            help="SOFTDESK_PASSWORD_HASHING['WORKERS'] values to compare, 0 for inline")
+        parser.add_argument('--requests', type=int, default=100, help="logins, and as many reads")
+        parser.add_argument('--concurrency', type=int, default=20, help="concurrent logins")
+        parser.add_argument('--read-concurrency', type=int, default=4, help="concurrent project list reads")
+        parser.add_argument('--url', help="base URL of a running server (default: the in-process test client)")
+        parser.add_argument('--prefix', default='bench', help="username prefix of the generate_data users")
+        parser.add_argument('--password', default='benchmark')
+        parser.add_argument('--output', help="save the results to this JSON file")
+
+    def handle(self, *args, **options):
+        runner = benchmark.Command(stdout=self.stdout, stderr=self.stderr)
+        targets = runner.targets({'prefix': options['prefix'], 'targets': 50})
+        rng = random.Random(0)
+        total = options['requests']
+        logins = [rng.choice(targets).request('login', options['password']) for _ in range(total)]
+        reads = [rng.choice(targets).request('project-list', options['password']) for _ in range(total)]
+
+        results = {}
+        with override_settings(ALLOWED_HOSTS=['testserver', *settings.ALLOWED_HOSTS]):
+            for workers in options['workers']:
+                # a running server (--url) hashes with its own settings
+                with override_settings(SOFTDESK_PASSWORD_HASHING={**hashing.get_settings(), 'WORKERS': workers}):
+                    with ThreadPoolExecutor(max_workers=2) as pool:
+                        login = pool.submit(runner.run, logins, options['concurrency'], options['url'])
+                        read = pool.submit(runner.run, reads, options['read_concurrency'], options['url'])
+                        label = f'workers={workers}' if workers else 'inline'
+                        results[label] = {'login': login.result(), 'project-list': read.result()}
+                self.stdout.write(self.line(label, results[label]))
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump({'concurrency': options['concurrency'], 'requests': total, 'runs': results}, output,
+                          indent=2)
+            self.stdout.write(f"Saved to {options['output']}")
+
+    def line(self, label, result):
+        login, read = result['login'], result['project-list']
+        return (f"{label:<11} login {login['requests_per_second']:>6.1f} req/s  p95 {login['p95_ms']:>7.1f} ms"
+                f"  rejected {login['errors']:>4}   project-list p95 {read['p95_ms']:>7.1f} ms")
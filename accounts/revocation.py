@@ -0,0 +1,109 @@
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+# Revoked tokens: the rows of simplejwt's token_blacklist tables, mirrored in a per-process
+# index of the JTIs that have not expired yet. Checking a token is a lookup in that index;
+# the index is loaded by the first check of the process, then reads the tokens blacklisted
+# since its last read at most every SOFTDESK_REVOCATION['REFRESH'] seconds (0: at every
+# check). Tokens revoked in this process are indexed at once, in the other ones within
+# REFRESH seconds.
+#
+# Ids do not commit in order (on PostgreSQL a transaction holding a lower id may commit
+# after a higher one was read), so every read goes back MARGIN ids before the last one
+# seen, and the whole index is reloaded every RELOAD seconds for what is older still.
+
+
+def get_settings():
+    return {'REFRESH': 5, 'MARGIN': 1000, 'RELOAD': 300, **getattr(settings, 'SOFTDESK_REVOCATION', {})}
+
+
+class RevokedTokens:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        # {jti: expires at}, and the last BlacklistedToken read
+        with self.lock:
+            self.jtis = {}
+            self.last_id = None
+            self.read_at = None
+            self.loaded_at = None
+
+    def due(self):
+        return self.read_at is None or time.monotonic() - self.read_at >= get_settings()['REFRESH']
+
+    def refresh(self, force=False):
+        with self.lock:
+            if not force and not self.due():
+                return
+            options = get_settings()
+            now = timezone.now()
+            rows = BlacklistedToken.objects.filter(token__expires_at__gt=now)
+            if self.loaded_at is None or time.monotonic() - self.loaded_at >= options['RELOAD']:
+                self.jtis = {}
+                self.last_id = None
+                self.loaded_at = time.monotonic()
+            elif self.last_id is not None:
+                rows = rows.filter(id__gt=self.last_id - options['MARGIN'])
+            for row_id, jti, expires_at in rows.order_by('id').values_list('id', 'token__jti', 'token__expires_at'):
+                self.jtis[jti] = expires_at
+                self.last_id = max(row_id, self.last_id or row_id)
+            self.jtis = {jti: expires_at for jti, expires_at in self.jtis.items() if expires_at > now}
+            self.read_at = time.monotonic()
+
+    def add(self, jti, expires_at):
+        with self.lock:
+            self.jtis[jti] = expires_at
+
+    def contains(self, jti, refresh=True):
+        if refresh and self.due():
+            self.refresh()
+        return jti in self.jtis
+
+
+revoked_tokens = RevokedTokens()
+
+
+def is_revoked(token, refresh=True):
+    # refresh=False only looks at the index as it is, for async callers that refreshed it
+    return revoked_tokens.contains(token[api_settings.JTI_CLAIM], refresh)
+
+
+def revoke(*tokens):
+    # blacklists any tokens, access tokens included (they get an OutstandingToken row
+    # first), in three idempotent queries
+    rows = {
+        token[api_settings.JTI_CLAIM]: OutstandingToken(
+            jti=token[api_settings.JTI_CLAIM],
+            user_id=token.get(api_settings.USER_ID_CLAIM),
+            token=str(token),
+            created_at=datetime_from_epoch(token['iat']) if 'iat' in token else None,
+            expires_at=datetime_from_epoch(token['exp']),
+        ) for token in tokens
+    }
+    OutstandingToken.objects.bulk_create(rows.values(), ignore_conflicts=True)
+    outstanding = OutstandingToken.objects.filter(jti__in=list(rows)).values_list('id', flat=True)
+    BlacklistedToken.objects.bulk_create(
+        [BlacklistedToken(token_id=token_id) for token_id in outstanding], ignore_conflicts=True
+    )
+    for jti, row in rows.items():
+        revoked_tokens.add(jti, row.expires_at)
+
+
+class IndexedRefreshToken(RefreshToken):
+    # RefreshToken, checked against the index rather than with a query
+    def check_blacklist(self):
+        if is_revoked(self):
+            raise TokenError("Token is blacklisted")
+
+    def blacklist(self):
+        revoke(self)
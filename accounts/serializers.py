@@ -1,12 +1,21 @@
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from .authentication import add_claims
 from .models import User
+from .revocation import IndexedRefreshToken
 
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = IndexedRefreshToken
+
     @classmethod
     def get_token(cls, user):
-        token = super().get_token(user)       
-        return token
+        token = super().get_token(user)
+        # read back by TokenClaimsAuthentication instead of the user row
+        return add_claims(token, user)
+
+class IndexedTokenRefreshSerializer(TokenRefreshSerializer):
+    # refresh tokens are checked against the revocation index, not with a query
+    token_class = IndexedRefreshToken
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
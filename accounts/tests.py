@@ -1,3 +1,366 @@
-from django.test import TestCase
+import threading
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import hashers
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.exceptions import Throttled
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from accounts import hashing
+from accounts.authentication import hydrated_users
+from accounts.revocation import revoked_tokens
+from accounts.serializers import MyTokenObtainPairSerializer
+from accounts.models import User
+from SoftdeskAPI.testing import BUDGET_SCALES, QueryBudgetMixin
+from softdesk.models import Project
+
+# the budgets measure queries, not PBKDF2 rounds
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, SOFTDESK_HYDRATED_USERS={'SIZE': 2, 'TIMEOUT': 60})
+class TokenClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        hydrated_users.clear()
+        self.user = User.objects.create(username='claims', password=make_password('pass1234'),
+                                        date_of_birth=date(1990, 1, 1), email='claims@example.com')
+        response = self.client.post(reverse('token_obtain_pair'), {'username': 'claims', 'password': 'pass1234'})
+        self.token = response.data['access']
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+    def user_queries(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data, format='json')
+        return response, [query['sql'] for query in queries if 'FROM "accounts_user"' in query['sql']]
+
+    def test_token_carries_the_claims(self):
+        token = AccessToken(self.token)
+        self.assertEqual((token['user_id'], token['username']), (self.user.id, 'claims'))
+        self.assertNotIn('is_staff', token)
+
+        refreshed = self.client.post(reverse('token_refresh'), {'refresh': str(RefreshToken.for_user(self.user))})
+        self.assertEqual(refreshed.status_code, 200)
+        register = self.client.post(reverse('user_signup'), {
+            'username': 'newcomer', 'password': 'pass1234', 'date_of_birth': '1990-01-01',
+        }, format='json')
+        self.assertEqual(AccessToken(register.data['access'])['username'], 'newcomer')
+
+    def test_authenticated_reads_skip_the_user_query(self):
+        response, queries = self.user_queries('get', reverse('project-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, [])
+
+        # tokens issued without the claims still work, through the user row
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        response, queries = self.user_queries('get', reverse('project-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 1)
+
+    def test_token_user_works_for_writes_and_ownership(self):
+        response, queries = self.user_queries('post', reverse('project-list'), {
+            'name': 'p', 'description': 'd', 'project_type': 'web',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(queries, [])
+        project = Project.objects.get(creator=self.user)
+        url = reverse('retrieve-update-delete-project', kwargs={'id': project.id})
+        self.assertEqual(self.client.patch(url, {'name': 'renamed'}, format='json').status_code, 200)
+
+    def test_staff_flag_is_read_from_the_row(self):
+        url = reverse('timing-report')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        User.objects.filter(id=self.user.id).update(is_staff=True)
+        response, queries = self.user_queries('get', url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 1)
+
+        # a demoted user loses admin access with their next request, not when the token expires
+        User.objects.filter(id=self.user.id).update(is_staff=False)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_profile_reads_the_hydrated_user(self):
+        url = reverse('user-profile')
+        response, queries = self.user_queries('get', url)
+        self.assertEqual(response.data['email'], 'claims@example.com')
+        self.assertEqual(len(queries), 1)
+        response, queries = self.user_queries('get', url)
+        self.assertEqual(queries, [])
+
+        # writes read the row again, and evict it
+        self.client.patch(url, {'email': 'new@example.com'}, format='json')
+        self.assertEqual(self.client.get(url).data['email'], 'new@example.com')
+        self.assertEqual(User.objects.get(id=self.user.id).date_of_birth, date(1990, 1, 1))
+
+        User.objects.filter(id=self.user.id).delete()
+        hydrated_users.clear()
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+
+class DeletedUserTokenTests(TransactionTestCase):
+    # TransactionTestCase: the foreign keys are checked when the write commits
+    def test_writes_of_a_deleted_user_are_refused(self):
+        user = User.objects.create(username='gone', date_of_birth=date(1990, 1, 1))
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {MyTokenObtainPairSerializer.get_token(user).access_token}')
+        User.objects.filter(id=user.id).delete()
+
+        response = client.post(reverse('project-list'), {'name': 'p', 'description': 'd', 'project_type': 'web'})
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('WWW-Authenticate', response.headers)
+        self.assertFalse(Project.objects.exists())
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, SOFTDESK_REVOCATION={'REFRESH': 60})
+class TokenRevocationTests(TestCase):
+    def setUp(self):
+        revoked_tokens.clear()
+        password = make_password('pass1234')
+        self.user, self.other = User.objects.bulk_create([
+            User(username=username, password=password, date_of_birth=date(1990, 1, 1))
+            for username in ('revoked', 'other')
+        ])
+        self.tokens = self.login('revoked')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}")
+
+    def login(self, username):
+        return self.client.post(reverse('token_obtain_pair'), {'username': username, 'password': 'pass1234'}).data
+
+    def blacklist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, [query['sql'] for query in queries if 'token_blacklist' in query['sql']]
+
+    def test_logout_revokes_both_tokens(self):
+        response = self.client.post(reverse('user_logout'), {'refresh': self.tokens['refresh']})
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.client.get(reverse('project-list')).status_code, 401)
+        self.assertEqual(self.client.get(reverse('async-project-list')).status_code, 401)
+        refresh = APIClient().post(reverse('token_refresh'), {'refresh': self.tokens['refresh']})
+        self.assertEqual(refresh.status_code, 401)
+        self.assertEqual(BlacklistedToken.objects.count(), 2)
+
+        # a new login still works
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.login('revoked')['access']}")
+        self.assertEqual(self.client.get(reverse('project-list')).status_code, 200)
+
+    def test_checks_read_the_index_not_the_table(self):
+        response, queries = self.blacklist_queries(reverse('project-list'))
+        self.assertEqual(response.status_code, 200)
+        # the first check of the process loads the index
+        self.assertEqual(len(queries), 1)
+        response, queries = self.blacklist_queries(reverse('project-list'))
+        self.assertEqual(queries, [])
+
+    def test_tokens_revoked_elsewhere_are_read_incrementally(self):
+        self.client.get(reverse('project-list'))
+        # another process logs the user out
+        outstanding = OutstandingToken.objects.create(
+            jti=AccessToken(self.tokens['access'])['jti'], token=self.tokens['access'],
+            expires_at=timezone.now() + timedelta(minutes=5),
+        )
+        BlacklistedToken.objects.create(token=outstanding)
+        self.assertEqual(self.client.get(reverse('project-list')).status_code, 200)
+        with override_settings(SOFTDESK_REVOCATION={'REFRESH': 0}):
+            response, queries = self.blacklist_queries(reverse('project-list'))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(len(queries), 1)
+
+    def blacklist(self, token, **fields):
+        outstanding = OutstandingToken.objects.create(
+            jti=token['jti'], token=str(token), expires_at=timezone.now() + timedelta(minutes=5),
+        )
+        return BlacklistedToken.objects.create(token=outstanding, **fields)
+
+    def test_rows_committed_out_of_order_are_read(self):
+        revoked_tokens.refresh(force=True)
+        later = self.blacklist(AccessToken(self.login('other')['access']), id=500)
+        revoked_tokens.refresh(force=True)
+        # committed after the row of id 500 was read
+        self.blacklist(AccessToken(self.tokens['access']), id=400)
+        with override_settings(SOFTDESK_REVOCATION={'REFRESH': 0, 'MARGIN': 200}):
+            self.assertEqual(self.client.get(reverse('project-list')).status_code, 401)
+        self.assertTrue(revoked_tokens.contains(later.token.jti, refresh=False))
+
+        # further back than the margin, the next reload finds it
+        earlier = self.blacklist(AccessToken(self.login('revoked')['access']), id=100)
+        with override_settings(SOFTDESK_REVOCATION={'REFRESH': 0, 'MARGIN': 200}):
+            self.assertFalse(revoked_tokens.contains(earlier.token.jti))
+        with override_settings(SOFTDESK_REVOCATION={'REFRESH': 0, 'MARGIN': 200, 'RELOAD': 0}):
+            self.assertTrue(revoked_tokens.contains(earlier.token.jti))
+
+    def test_logout_needs_a_refresh_token_of_the_user(self):
+        url = reverse('user_logout')
+        self.assertEqual(self.client.post(url, {'refresh': 'garbage'}).status_code, 400)
+        self.assertEqual(self.client.post(url, {'refresh': self.login('other')['refresh']}).status_code, 403)
+        self.assertEqual(APIClient().post(url, {'refresh': self.tokens['refresh']}).status_code, 401)
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+@override_settings(SOFTDESK_PASSWORD_HASHING={'WORKERS': 2, 'MAX_PENDING': 4, 'ITERATIONS': 1000})
+class PasswordHashingTests(TestCase):
+    def login(self, username='hasher', password='pass1234'):
+        return self.client.post(reverse('token_obtain_pair'), {'username': username, 'password': password})
+
+    def hashing_threads(self, name):
+        # names of the threads that ran hashers.<name>
+        threads = []
+        original = getattr(hashers, name)
+
+        def record(*args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return original(*args, **kwargs)
+        return threads, mock.patch.object(hashers, name, side_effect=record)
+
+    def test_signup_and_login_hash_on_the_pool(self):
+        threads, patch = self.hashing_threads('make_password')
+        with patch:
+            response = self.client.post(reverse('user_signup'), {
+                'username': 'hasher', 'password': 'pass1234', 'date_of_birth': '1990-01-01',
+            })
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(threads[0].startswith('password-hashing'))
+        self.assertTrue(User.objects.get(username='hasher').password.startswith('pbkdf2_sha256$1000$'))
+
+        threads, patch = self.hashing_threads('check_password')
+        with patch:
+            self.assertEqual(self.login().status_code, 200)
+            self.assertEqual(self.login(password='wrong').status_code, 401)
+            self.assertEqual(self.login(username='nobody').status_code, 401)
+        self.assertEqual(len(threads), 2)
+        self.assertTrue(all(thread.startswith('password-hashing') for thread in threads))
+
+    def test_saturated_pool_returns_429(self):
+        User.objects.create(username='hasher', password=hashing.make_password('pass1234'),
+                            date_of_birth=date(1990, 1, 1))
+        started, release = threading.Event(), threading.Event()
+
+        def hold():
+            started.set()
+            release.wait()
+
+        with override_settings(SOFTDESK_PASSWORD_HASHING={'WORKERS': 1, 'MAX_PENDING': 1, 'ITERATIONS': 1000}):
+            # the only slot is taken by a hash that has not finished
+            busy = threading.Thread(target=hashing.run, args=(hold,))
+            busy.start()
+            started.wait()
+            try:
+                response = self.login()
+            finally:
+                release.set()
+                busy.join()
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response['Retry-After'], '1')
+            self.assertEqual(self.login().status_code, 200)
+
+    def test_hashes_are_upgraded_to_the_configured_cost(self):
+        with override_settings(SOFTDESK_PASSWORD_HASHING={'WORKERS': 0, 'ITERATIONS': 1200}):
+            user = User.objects.create(username='hasher', password=hashing.make_password('pass1234'),
+                                       date_of_birth=date(1990, 1, 1))
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1200$'))
+        self.assertEqual(self.login().status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+
+    def test_saturated_pool_skips_the_upgrade(self):
+        with override_settings(SOFTDESK_PASSWORD_HASHING={'WORKERS': 0, 'ITERATIONS': 1200}):
+            user = User.objects.create(username='hasher', password=hashing.make_password('pass1234'),
+                                       date_of_birth=date(1990, 1, 1))
+        # the password checks out, only the rehash finds the pool full
+        with mock.patch.object(hashing, 'make_password', side_effect=Throttled(wait=1)):
+            self.assertEqual(self.login().status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1200$'))
+
+
+class AccountsQueryBudgetMixin(QueryBudgetMixin):
+    query_budgets = {
+        # the refresh token is recorded as outstanding, so that it can be revoked
+        'user_signup': 3,
+        'token_obtain_pair': 2,
+        'token_refresh': 0,
+        'user_logout': 3,
+        'user-profile:get': 0,
+        'user-profile:patch': 1,
+        'user-profile:put': 1,
+        'user-profile:delete': 10,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        password = make_password('pass1234')
+        User.objects.bulk_create([
+            User(username=f'user-{i}', password=password, date_of_birth=date(1990, 1, 1))
+            for i in range(cls.rows)
+        ])
+        cls.user = User.objects.get(username='user-0')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # loaded by the first check of the process, not per request
+        revoked_tokens.clear()
+        revoked_tokens.refresh()
+
+    def test_signup(self):
+        response = self.request_within_budget('user_signup', 'post', reverse('user_signup'), {
+            'username': 'newcomer', 'password': 'pass1234', 'date_of_birth': '1990-01-01',
+        })
+        self.assertEqual(response.status_code, 201)
+
+    def test_login_and_refresh(self):
+        response = self.request_within_budget('token_obtain_pair', 'post', reverse('token_obtain_pair'), {
+            'username': 'user-0', 'password': 'pass1234',
+        })
+        self.assertEqual(response.status_code, 200)
+
+        refresh = response.data['refresh']
+        response = self.request_within_budget('token_refresh', 'post', reverse('token_refresh'), {
+            'refresh': refresh,
+        })
+        self.assertEqual(response.status_code, 200)
+
+        self.client.force_authenticate(None)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        response = self.request_within_budget('user_logout', 'post', reverse('user_logout'), {'refresh': refresh})
+        self.assertEqual(response.status_code, 200)
+
+    def test_profile(self):
+        url = reverse('user-profile')
+        response = self.request_within_budget('user-profile:get', 'get', url)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.request_within_budget('user-profile:patch', 'patch', url, {'can_be_contacted': True})
+        self.assertEqual(response.status_code, 200)
+
+        response = self.request_within_budget('user-profile:put', 'put', url, {'email': 'user-0@example.com'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_profile_delete(self):
+        response = self.request_within_budget('user-profile:delete', 'delete', reverse('user-profile'))
+        self.assertEqual(response.status_code, 204)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class AccountsQueryBudget10Tests(AccountsQueryBudgetMixin, TestCase):
+    rows = BUDGET_SCALES[0]
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class AccountsQueryBudget100Tests(AccountsQueryBudgetMixin, TestCase):
+    rows = BUDGET_SCALES[1]
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class AccountsQueryBudget1000Tests(AccountsQueryBudgetMixin, TestCase):
+    rows = BUDGET_SCALES[2]
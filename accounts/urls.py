@@ -6,5 +6,6 @@ urlpatterns = [
     path('user/signup/', views.user_register, name='user_signup'),
     path('user/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('user/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('user/logout/', views.user_logout, name='user_logout'),
     path('user/profile/', views.UserProfileView.as_view(), name='user-profile')
 ]
\ No newline at end of file
@@ -1,12 +1,16 @@
 from datetime import date
 from accounts.models import User
 from rest_framework.response import Response
+from accounts import hashing, revocation
+from accounts.authentication import hydrate
+from accounts.revocation import IndexedRefreshToken
 from accounts.serializers import MyTokenObtainPairSerializer, UserRegistrationSerializer, UserSerializer
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
-from django.contrib.auth.hashers import make_password
 from rest_framework.generics import RetrieveUpdateDestroyAPIView
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
 
 
 # Create your views here.
@@ -21,7 +25,7 @@ def user_register(request):
                 age = date.today().year - birthdate.year
                 
                 if age > 15:
-                    password = make_password(serializer.validated_data['password'])
+                    password = hashing.make_password(serializer.validated_data['password'])
                     serializer.validated_data['password'] = password
                     user = serializer.save()
                     token = MyTokenObtainPairSerializer.get_token(user)
@@ -42,6 +46,22 @@ def user_register(request):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def user_logout(request):
+    # revokes the refresh token of the body and the access token of the request
+    try:
+        refresh = IndexedRefreshToken(request.data.get('refresh', ''))
+    except TokenError as exc:
+        return Response({'message': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    if refresh[api_settings.USER_ID_CLAIM] != request.user.id:
+        return Response({'message': 'This refresh token belongs to another user.'},
+                        status=status.HTTP_403_FORBIDDEN)
+
+    revocation.revoke(refresh, *([request.auth] if request.auth is not None else []))
+    return Response({'message': 'Logged out successfully'}, status=status.HTTP_200_OK)
+
+
 class UserProfileView(RetrieveUpdateDestroyAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -49,13 +69,13 @@ class UserProfileView(RetrieveUpdateDestroyAPIView):
 
     def get(self, request, *args, **kwargs):
         # Get User Profile
-        user = self.request.user
+        user = hydrate(self.request.user)
         serializer = self.get_serializer(user)
         return Response(serializer.data)
 
     def update(self, request, *args, **kwargs):
         # Update User Profile
-        user = self.request.user
+        user = hydrate(self.request.user, fresh=True)
         serializer = UserSerializer(user, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
@@ -64,7 +84,7 @@ class UserProfileView(RetrieveUpdateDestroyAPIView):
 
     def delete(self, request, *args, **kwargs):
         # Delete User profile
-        user = self.request.user
+        user = hydrate(self.request.user, fresh=True)
         user.delete()
         return Response({'message': 'Compte utilisateur supprimé avec succès'},
                         status=status.HTTP_204_NO_CONTENT)
@@ -1,6 +1,11 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class SoftdeskConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'softdesk'
+
+    def ready(self):
+        from . import replicas
+        checks.register(replicas.check_pin_cache, checks.Tags.caches)
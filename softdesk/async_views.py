@@ -0,0 +1,180 @@
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from accounts.authentication import CLAIMS, TokenClaimsAuthentication, check_revocation
+from accounts.revocation import revoked_tokens
+from accounts.models import User
+from .memberships import aget_project_ids
+from .models import Comment, Issue, Project
+from .paginations import CustomPagination
+from .serializers import CommentSerializer, IssueListSerializer, ProjectDetailSerializer, ProjectListSerializer
+from .views import ProjectView, annotate_issue_counts, annotate_project_counts, filter_projects
+
+# Async (ASGI) twins of the read endpoints: project list/detail, issue detail with
+# its comments and comment detail. They return the same payloads as the DRF views
+# and never block the event loop while waiting for the database. Django runs the
+# async ORM queries one at a time on its thread-sensitive executor, so they are
+# awaited in turn: membership and existence first, then the page, which a refused
+# request never pays for.
+
+
+class AsyncJWTAuthentication(TokenClaimsAuthentication):
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = JWTAuthentication.get_validated_token(self, raw_token)
+        if revoked_tokens.due():
+            await sync_to_async(check_revocation)(validated_token)
+        else:
+            check_revocation(validated_token, refresh=False)
+        if all(claim in validated_token for claim in CLAIMS):
+            return self.get_user(validated_token)
+
+        user = await User.objects.filter(
+            **{api_settings.USER_ID_FIELD: validated_token[api_settings.USER_ID_CLAIM]}
+        ).afirst()
+        if user is None or not user.is_active:
+            return None
+        return user
+
+
+def error(detail, status):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def authenticated(view):
+    # JWT authentication, sets request.user the way the DRF views see it
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return error(f'Method "{request.method}" not allowed.', 405)
+        try:
+            user = await AsyncJWTAuthentication().aauthenticate(request)
+        except APIException as exc:
+            return error(exc.detail, exc.status_code)
+        if user is None:
+            return error('Authentication credentials were not provided.', 401)
+        request.user = user
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def page_bounds(request):
+    pagination = CustomPagination
+    try:
+        page = int(request.GET.get('page', 1))
+        size = int(request.GET.get(pagination.page_size_query_param, pagination.page_size))
+    except ValueError:
+        return None
+    if page < 1 or size < 1:
+        return None
+    return page, min(size, pagination.max_page_size)
+
+
+async def fetch_page(queryset, page, size):
+    # count and page rows
+    offset = (page - 1) * size
+    return await queryset.acount(), await fetch_all(queryset[offset:offset + size])
+
+
+async def fetch_all(queryset):
+    return [row async for row in queryset]
+
+
+def paginated(request, count, page, size, results):
+    # same shape as CustomPagination.get_paginated_response
+    url = request.build_absolute_uri()
+    return JsonResponse({
+        'count': count,
+        'next': replace_query_param(url, 'page', page + 1) if page * size < count else None,
+        'previous': None if page == 1 else (
+            remove_query_param(url, 'page') if page == 2 else replace_query_param(url, 'page', page - 1)
+        ),
+        'results': results,
+    })
+
+
+@authenticated
+async def project_list(request):
+    bounds = page_bounds(request)
+    if bounds is None:
+        return error('Invalid page.', 404)
+    try:
+        queryset = filter_projects(Project.objects.select_related('creator'), request.user, request.GET)
+    except ValidationError as exc:
+        return JsonResponse(exc.detail, status=400)
+
+    queryset = ProjectListSerializer.defer_unrequested(queryset, request, 'project')
+    count, projects = await fetch_page(annotate_project_counts(queryset), *bounds)
+    context = {'request': request, 'resource': 'project'}
+    return paginated(request, count, *bounds, ProjectListSerializer(projects, many=True, context=context).data)
+
+
+@authenticated
+async def project_detail(request, id):
+    bounds = page_bounds(request)
+    if bounds is None:
+        return error('Invalid page.', 404)
+
+    issues = IssueListSerializer.defer_unrequested(
+        Issue.objects.filter(project_id=id).select_related('creator', 'assigned_to').order_by('created_at', 'id'),
+        request, 'project',
+    )
+    projects = ProjectDetailSerializer.defer_unrequested(ProjectView.queryset, request, 'project')
+    project = await projects.filter(id=id).afirst()
+    if project is None:
+        return error('No Project matches the given query.', 404)
+    if project.id not in await aget_project_ids(request):
+        return error('You do not have permission to perform this action.', 403)
+    count, page = await fetch_page(annotate_issue_counts(issues), *bounds)
+
+    context = {'request': request, 'resource': 'project'}
+    return paginated(request, count, *bounds, {
+        'project_details': ProjectDetailSerializer(project, context=context).data,
+        'project_issues': IssueListSerializer(page, many=True, context=context).data,
+    })
+
+
+@authenticated
+async def issue_detail(request, issue_id):
+    bounds = page_bounds(request)
+    if bounds is None:
+        return error('Invalid page.', 404)
+
+    comments = CommentSerializer.defer_unrequested(
+        Comment.objects.filter(issue_id=issue_id).select_related('creator').order_by('created_at', 'id'),
+        request, 'issue',
+    )
+    issues = IssueListSerializer.defer_unrequested(
+        Issue.objects.select_related('creator', 'assigned_to').filter(id=issue_id), request, 'issue'
+    )
+    issue = await annotate_issue_counts(issues).afirst()
+    if issue is None:
+        return error('Issue not found', 404)
+    if issue.project_id not in await aget_project_ids(request):
+        return error('You are not a contributor to this project', 403)
+    count, page = await fetch_page(comments, *bounds)
+
+    context = {'request': request, 'resource': 'issue'}
+    return paginated(request, count, *bounds, {
+        'issue_details': IssueListSerializer(issue, context=context).data,
+        'issue_comments': CommentSerializer(page, many=True, context=context).data,
+    })
+
+
+@authenticated
+async def comment_detail(request, id):
+    comment = await CommentSerializer.defer_unrequested(
+        Comment.objects.select_related('creator', 'issue').filter(id=id), request, 'comment'
+    ).afirst()
+    if comment is None:
+        return error('No Comment matches the given query.', 404)
+    if comment.issue.project_id not in await aget_project_ids(request):
+        return error('You do not have permission to view this comment !', 403)
+    return JsonResponse(CommentSerializer(comment, context={'request': request, 'resource': 'comment'}).data)
@@ -0,0 +1,92 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Cached response payloads of the project list and project detail views.
+# Entries are never deleted one by one: every scope has a version stored next to
+# them, a write bumps the version and the stale entries simply expire. A version only
+# moves in the cache of the worker that wrote, so the keys also hold the state of the
+# rows (the newest update time), which every worker reads from the database.
+
+PREFIX = 'softdesk:responses'
+HITS_KEY = f'{PREFIX}:hits'
+MISSES_KEY = f'{PREFIX}:misses'
+PROJECT_LIST = 'projects'
+
+
+def get_cache():
+    alias = getattr(settings, 'SOFTDESK_RESPONSE_CACHE', {}).get('ALIAS')
+    return caches[alias] if alias else None
+
+
+def get_timeout():
+    return getattr(settings, 'SOFTDESK_RESPONSE_CACHE', {}).get('TIMEOUT', 300)
+
+
+def project_scope(project_id):
+    return f'project:{project_id}'
+
+
+def count(cache, key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def get_version(cache, scope):
+    version_key = f'{PREFIX}:{scope}:version'
+    version = cache.get(version_key)
+    if version is None:
+        # a fresh timestamp, so an evicted version never brings back older entries
+        version = time.time_ns()
+        cache.set(version_key, version, None)
+    return version
+
+
+def make_key(cache, request, scope, per_user, state):
+    # state is anything the caller already knows to change with the data, e.g. a row count
+    path = hashlib.md5(f'{request.get_full_path()}:{state}'.encode()).hexdigest()
+    user = f':{request.user.id}' if per_user else ''
+    return f'{PREFIX}:{scope}:{get_version(cache, scope)}{user}:{path}'
+
+
+def lookup(request, scope, per_user=False, state=''):
+    # (key, cached payload of this page of the scope or None); the key is taken before the
+    # rows are read, so a write in between leaves whatever the caller stores under it stale
+    # rather than under the bumped version
+    cache = get_cache()
+    if cache is None:
+        return None, None
+    key = make_key(cache, request, scope, per_user, state)
+    value = cache.get(key)
+    count(cache, MISSES_KEY if value is None else HITS_KEY)
+    return key, value
+
+
+def store(key, value):
+    # key from lookup, None when the cache is disabled
+    cache = get_cache()
+    if cache is not None and key is not None:
+        cache.set(key, value, get_timeout())
+
+
+def invalidate(*scopes):
+    cache = get_cache()
+    if cache is not None:
+        cache.set_many({f'{PREFIX}:{scope}:version': time.time_ns() for scope in scopes}, None)
+
+
+def invalidate_project(project_id):
+    # the list shows every project, so it goes stale with any of them
+    invalidate(project_scope(project_id), PROJECT_LIST)
+
+
+def stats():
+    cache = get_cache()
+    if cache is None:
+        return {'hits': 0, 'misses': 0}
+    values = cache.get_many([HITS_KEY, MISSES_KEY])
+    return {'hits': values.get(HITS_KEY, 0), 'misses': values.get(MISSES_KEY, 0)}
@@ -0,0 +1,41 @@
+import hashlib
+
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from .caching import invalidate_project
+from .models import Issue, Project
+
+
+def touch_project(project_id):
+    # a project detail page lists its issues and contributors, their changes bump the project
+    # and drop its cached responses
+    Project.objects.filter(id=project_id).update(updated_at=timezone.now())
+    invalidate_project(project_id)
+
+
+def touch_issue(issue_id):
+    # an issue detail page lists its comments, their changes bump the issue
+    Issue.objects.filter(id=issue_id).update(updated_at=timezone.now())
+
+
+def is_conditional(request):
+    # ETags only: updated_at has sub-second precision, a Last-Modified date would not tell
+    # two writes of the same second apart
+    return 'HTTP_IF_NONE_MATCH' in request.META
+
+
+def make_etag(request, updated_at, extra=''):
+    # the full path keeps pages, page sizes and pagination modes apart
+    key = f'{request.get_full_path()}:{request.user.id}:{updated_at.isoformat()}:{extra}'
+    return quote_etag(hashlib.md5(key.encode()).hexdigest())
+
+
+def not_modified(request, updated_at, extra=''):
+    # a 304 response when the client copy is still fresh, None otherwise
+    return get_conditional_response(request, etag=make_etag(request, updated_at, extra))
+
+
+def set_validators(request, response, updated_at, extra=''):
+    response['ETag'] = make_etag(request, updated_at, extra)
+    return response
@@ -0,0 +1,74 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from .models import Comment, Issue
+
+# rows fetched per round trip by the server-side cursors
+EXPORT_CHUNK_SIZE = 2000
+
+ISSUE_FIELDS = ['id', 'name', 'description', 'creator', 'assigned_to', 'status', 'priority', 'tag', 'created_at']
+COMMENT_FIELDS = ['id', 'creator', 'comment', 'created_at']
+FLAT_FIELDS = [f'issue_{field}' for field in ISSUE_FIELDS] + [f'comment_{field}' for field in COMMENT_FIELDS]
+
+
+def iter_issues(project_id):
+    issues = Issue.objects.filter(project_id=project_id).order_by('id').values_list(
+        'id', 'name', 'description', 'creator__username', 'assigned_to__username',
+        'status', 'priority', 'tag', 'created_at',
+    )
+    for row in issues.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield dict(zip(ISSUE_FIELDS, row))
+
+
+def iter_comments(project_id):
+    comments = Comment.objects.filter(issue__project_id=project_id).order_by(
+        'issue_id', 'created_at', 'id'
+    ).values_list('issue_id', 'id', 'creator__username', 'comment', 'created_at')
+    for row in comments.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield row[0], dict(zip(COMMENT_FIELDS, row[1:]))
+
+
+def iter_issues_with_comments(project_id):
+    # merge join of two sorted streams: two queries for the whole project, whatever its size
+    comments = iter_comments(project_id)
+    pending = next(comments, None)
+    for issue in iter_issues(project_id):
+        # comments of issues that no longer exist are skipped
+        while pending is not None and pending[0] < issue['id']:
+            pending = next(comments, None)
+        issue_comments = []
+        while pending is not None and pending[0] == issue['id']:
+            issue_comments.append(pending[1])
+            pending = next(comments, None)
+        yield issue, issue_comments
+
+
+def iter_flat_rows(project_id):
+    empty_comment = dict.fromkeys(COMMENT_FIELDS)
+    for issue, comments in iter_issues_with_comments(project_id):
+        issue_values = {f'issue_{field}': value for field, value in issue.items()}
+        for comment in comments or [empty_comment]:
+            yield dict(issue_values, **{f'comment_{field}': value for field, value in comment.items()})
+
+
+def ndjson_lines(project_id, flat=False):
+    if flat:
+        for row in iter_flat_rows(project_id):
+            yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+    else:
+        for issue, comments in iter_issues_with_comments(project_id):
+            yield json.dumps(dict(issue, comments=comments), cls=DjangoJSONEncoder) + '\n'
+
+
+class Echo:
+    # file-like object handing back what csv.writer writes, so rows can be streamed
+    def write(self, value):
+        return value
+
+
+def csv_lines(project_id):
+    writer = csv.DictWriter(Echo(), fieldnames=FLAT_FIELDS)
+    yield writer.writeheader()
+    for row in iter_flat_rows(project_id):
+        yield writer.writerow(row)
@@ -0,0 +1,68 @@
+from functools import cached_property
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from .serializers import CommentSerializer, IssueListSerializer, ProjectListSerializer
+from .timing import measure_serializer
+
+# Read-only list pages built straight from values() rows instead of serializer instances.
+# Each CompiledSerializer stands for a serializer of the list endpoints: its fields are
+# read once, the rows then only go through the conversions that change a value
+# (datetimes), and the output is the serializer's (checked by FastPathParityTests).
+# Requests with ?fields= or ?expand= keep using the serializers.
+
+
+def datetime_converter(field):
+    # DateTimeField.to_representation with the output timezone looked up once per page, not per value
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if isinstance(value, str) or timezone.is_naive(value):
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+class CompiledSerializer:
+    def __init__(self, serializer_class, sources=None):
+        self.serializer_class = serializer_class
+        # values() path of the fields that are not a plain model column, e.g. method fields
+        self.sources = sources or {}
+
+    @cached_property
+    def fields(self):
+        fields = []
+        for name, field in self.serializer_class().fields.items():
+            path = self.sources.get(name, field.source.replace('.', '__'))
+            fields.append((name, path, field if isinstance(field, serializers.DateTimeField) else None))
+        return fields
+
+    def values(self, queryset):
+        return queryset.values(*[path for _, path, _ in self.fields])
+
+    def render(self, rows):
+        fields = [
+            (name, path, datetime_converter(field) if field is not None else None) for name, path, field in self.fields
+        ]
+        with measure_serializer():
+            return [{
+                name: convert(row[path]) if convert is not None and row[path] is not None else row[path]
+                for name, path, convert in fields
+            } for row in rows]
+
+
+PROJECT_LIST = CompiledSerializer(ProjectListSerializer, {'creator': 'creator__username'})
+ISSUE_LIST = CompiledSerializer(IssueListSerializer, {'assigned_to': 'assigned_to__username'})
+COMMENT_LIST = CompiledSerializer(CommentSerializer)
+
+
+def applies(request):
+    if not getattr(settings, 'SOFTDESK_SERIALIZER_FAST_PATH', True):
+        return False
+    return not any(name == 'expand' or name.startswith('fields') for name in request.query_params)
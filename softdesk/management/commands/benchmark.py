@@ -0,0 +1,205 @@
+import json
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.db.models import Max
+from django.test import Client, override_settings
+from django.urls import reverse
+from accounts.models import User
+from accounts.serializers import MyTokenObtainPairSerializer
+from softdesk.models import Comment, Issue, Project, ProjectContributor
+from softdesk.timing import percentile
+
+# Drives the real URL routes, through the Django test client (in process) or against a
+# running server (--url), at a given concurrency, and reports throughput and latency
+# percentiles per endpoint. The requests are spread over the contributors of the
+# generate_data users, big projects and small ones alike. --output saves the run as
+# JSON and --compare prints the change from a saved run.
+
+ROUTES = ('project-list', 'project-detail', 'project-stats', 'issue-detail', 'comment-detail', 'search',
+          'comment-create', 'login')
+# routes that write, only run when asked for with --routes
+WRITES = ('comment-create',)
+
+
+class Target:
+    # one contributor with a project, an issue and a comment of that project
+    def __init__(self, user, project, issue, comment):
+        self.user = user
+        # with the claims login puts in, which the token authentication reads instead of the user row
+        self.token = str(MyTokenObtainPairSerializer.get_token(user).access_token)
+        self.project = project
+        self.issue = issue
+        self.comment = comment
+
+    def request(self, route, password):
+        # (method, path, json body, bearer token)
+        if route == 'project-list':
+            return 'GET', reverse('project-list'), None, self.token
+        if route == 'project-detail':
+            return 'GET', reverse('retrieve-update-delete-project', kwargs={'id': self.project}), None, self.token
+        if route == 'project-stats':
+            return 'GET', reverse('project-stats', kwargs={'id': self.project}), None, self.token
+        if route == 'issue-detail':
+            return 'GET', reverse('retrieve-update-delete-issue', kwargs={'issue_id': self.issue}), None, self.token
+        if route == 'comment-detail':
+            return 'GET', reverse('retrieve-update-delete-comment', kwargs={'id': self.comment}), None, self.token
+        if route == 'search':
+            return 'GET', reverse('search') + '?q=error', None, self.token
+        if route == 'comment-create':
+            return ('POST', reverse('comment-create', kwargs={'issue_id': self.issue}),
+                    {'comment': 'benchmark comment'}, self.token)
+        return 'POST', reverse('token_obtain_pair'), {'username': self.user.username, 'password': password}, None
+
+
+def summarize(durations, errors, elapsed):
+    durations = sorted(durations)
+    return {
+        'requests': len(durations),
+        'errors': errors,
+        'requests_per_second': round(len(durations) / elapsed, 1) if elapsed else 0.0,
+        'mean_ms': round(statistics.fmean(durations) * 1000, 2) if durations else 0.0,
+        **{f'p{rank}_ms': round(percentile(durations, rank) * 1000, 2) for rank in (50, 95, 99)},
+        'max_ms': round(durations[-1] * 1000, 2) if durations else 0.0,
+    }
+
+
+class Command(BaseCommand):
+    help = "Benchmark the API routes at a given concurrency and save the results as JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--routes', nargs='+', choices=ROUTES,
+                            help=f"default: every read route and login ({', '.join(WRITES)} only on request)")
+        parser.add_argument('--requests', type=int, default=200, help="requests per route")
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--url', help="base URL of a running server, e.g. http://127.0.0.1:8000 "
+                                          "(default: the in-process test client)")
+        parser.add_argument('--prefix', default='bench', help="username prefix of the generate_data users")
+        parser.add_argument('--password', default='benchmark', help="their password, for the login route")
+        parser.add_argument('--targets', type=int, default=50, help="contributors the requests are spread over")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="save the results to this JSON file")
+        parser.add_argument('--compare', help="JSON file of an earlier run to compare with")
+
+    def handle(self, *args, **options):
+        routes = options['routes'] or [route for route in ROUTES if route not in WRITES]
+        targets = self.targets(options)
+        total, concurrency = options['requests'], options['concurrency']
+        rng = random.Random(options['seed'])
+        baseline = self.load(options['compare']) if options['compare'] else None
+
+        results = {}
+        with override_settings(ALLOWED_HOSTS=['testserver', *settings.ALLOWED_HOSTS]):
+            for route in routes:
+                plan = [rng.choice(targets).request(route, options['password']) for _ in range(total)]
+                results[route] = self.run(plan, concurrency, options['url'])
+                self.stdout.write(self.line(route, results[route], baseline))
+
+        run = {
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'target': options['url'] or 'test client',
+            'database': {
+                'vendor': connection.vendor,
+                'engine': connection.settings_dict['ENGINE'],
+                'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+                'options': connection.settings_dict['OPTIONS'],
+            },
+            'concurrency': concurrency,
+            'requests_per_route': total,
+            'rows': {model.__name__: model.objects.count() for model in (User, Project, Issue, Comment)},
+            'routes': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(run, output, indent=2)
+            self.stdout.write(f"Saved to {options['output']}")
+
+    def targets(self, options):
+        memberships = list(
+            ProjectContributor.objects.filter(contributor__username__startswith=f"{options['prefix']}-")
+            .select_related('contributor').order_by('?')[:options['targets'] * 4]
+        )
+        # the latest comment of each project, and its issue
+        latest = Comment.objects.filter(
+            issue__project__in={membership.project_id for membership in memberships}
+        ).values('issue__project').annotate(latest=Max('id')).values_list('latest', flat=True)
+        comments = {
+            project: (issue, comment)
+            for comment, issue, project in Comment.objects.filter(id__in=list(latest))
+            .values_list('id', 'issue_id', 'issue__project_id')
+        }
+        targets = [
+            Target(membership.contributor, membership.project_id, *comments[membership.project_id])
+            for membership in memberships if membership.project_id in comments
+        ][:options['targets']]
+        if not targets:
+            raise CommandError(f"No {options['prefix']}-* contributor with an issue and a comment, "
+                               f"run generate_data first")
+        return targets
+
+    def run(self, plan, concurrency, url):
+        call = self.live_call(url) if url else self.client_call
+
+        def timed(request):
+            start = time.perf_counter()
+            ok = call(*request)
+            return time.perf_counter() - start, ok
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(timed, plan))
+        elapsed = time.perf_counter() - start
+        return summarize([duration for duration, ok in outcomes if ok],
+                         sum(not ok for _, ok in outcomes), elapsed)
+
+    def client_call(self, method, path, body, token):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        # a view that raises counts as an error, as a 500 would
+        client = Client(raise_request_exception=False)
+        try:
+            if method == 'GET':
+                response = client.get(path, headers=headers)
+            else:
+                response = client.post(path, json.dumps(body), content_type='application/json', headers=headers)
+            return response.status_code < 400
+        finally:
+            # what the end of a real request does, the test client skips it
+            close_old_connections()
+
+    def live_call(self, url):
+        def call(method, path, body, token):
+            headers = {'Content-Type': 'application/json'}
+            if token:
+                headers['Authorization'] = f'Bearer {token}'
+            data = json.dumps(body).encode() if body is not None else None
+            try:
+                with urlopen(Request(url.rstrip('/') + path, data, headers, method=method)) as response:
+                    response.read()
+                    return response.status < 400
+            except HTTPError:
+                return False
+        return call
+
+    def load(self, path):
+        try:
+            with open(path) as baseline:
+                return json.load(baseline)['routes']
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(f"Cannot read {path}: {exc}")
+
+    def line(self, route, result, baseline):
+        line = (f"{route:<15} {result['requests_per_second']:>8.1f} req/s  p50 {result['p50_ms']:>7.1f} ms"
+                f"  p95 {result['p95_ms']:>7.1f} ms  p99 {result['p99_ms']:>7.1f} ms  errors {result['errors']}")
+        before = (baseline or {}).get(route)
+        if before and before['requests_per_second']:
+            change = result['requests_per_second'] / before['requests_per_second'] - 1
+            line += f"  ({change:+.0%} req/s, p95 was {before['p95_ms']:.1f} ms)"
+        return line
@@ -0,0 +1,96 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from accounts.models import User
+from accounts.serializers import MyTokenObtainPairSerializer
+from softdesk.models import Comment, ProjectContributor
+
+# Compares the DRF read endpoints served through the WSGI handler with their async
+# twins served through the ASGI handler, in process, at the same concurrency. The async
+# views have neither the response cache nor the values() fast path, both are off for
+# the run so that the two sides do the same work, and the token is the one login
+# issues, so that both authenticate from its claims.
+
+
+def summary(label, durations, elapsed):
+    durations = sorted(durations)
+    p95 = durations[max(int(len(durations) * 0.95) - 1, 0)]
+    return (f"{label:<32} {len(durations) / elapsed:>8.1f} req/s"
+            f"  p50 {statistics.median(durations) * 1000:>7.1f} ms  p95 {p95 * 1000:>7.1f} ms")
+
+
+class Command(BaseCommand):
+    help = "Benchmark the WSGI read endpoints against their ASGI twins"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help="contributor whose token is used for the requests")
+        parser.add_argument('--requests', type=int, default=200, help="requests per endpoint")
+        parser.add_argument('--concurrency', type=int, default=10)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user {options['username']}")
+        membership = ProjectContributor.objects.filter(contributor=user).select_related('project').first()
+        if membership is None:
+            raise CommandError(f"{user.username} does not contribute to any project")
+        project = membership.project
+        issue = project.issue_set.order_by('id').first()
+        comment = Comment.objects.filter(issue__project=project).order_by('id').first()
+
+        routes = [('project-list', 'async-project-list', {})]
+        routes.append(('retrieve-update-delete-project', 'async-project-detail', {'id': project.id}))
+        if issue is not None:
+            routes.append(('retrieve-update-delete-issue', 'async-issue-detail', {'issue_id': issue.id}))
+        if comment is not None:
+            routes.append(('retrieve-update-delete-comment', 'async-comment-detail', {'id': comment.id}))
+
+        token = MyTokenObtainPairSerializer.get_token(user).access_token
+        headers = {'Authorization': f'Bearer {token}'}
+        total, concurrency = options['requests'], options['concurrency']
+        with override_settings(ALLOWED_HOSTS=['testserver'], SOFTDESK_RESPONSE_CACHE={'ALIAS': None},
+                               SOFTDESK_SERIALIZER_FAST_PATH=False):
+            for sync_name, async_name, kwargs in routes:
+                self.stdout.write(self.run_wsgi(reverse(sync_name, kwargs=kwargs), headers, total, concurrency))
+                self.stdout.write(asyncio.run(
+                    self.run_asgi(reverse(async_name, kwargs=kwargs), headers, total, concurrency)
+                ))
+
+    def run_wsgi(self, url, headers, total, concurrency):
+        def call(_):
+            client = Client()
+            start = time.perf_counter()
+            response = client.get(url, headers=headers)
+            duration = time.perf_counter() - start
+            connections.close_all()
+            if response.status_code != 200:
+                raise CommandError(f"GET {url} returned {response.status_code}")
+            return duration
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            durations = list(pool.map(call, range(total)))
+        return summary(f"WSGI {url}", durations, time.perf_counter() - start)
+
+    async def run_asgi(self, url, headers, total, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def call():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(url, headers=headers)
+                if response.status_code != 200:
+                    raise CommandError(f"GET {url} returned {response.status_code}")
+                return time.perf_counter() - start
+
+        start = time.perf_counter()
+        durations = await asyncio.gather(*(call() for _ in range(total)))
+        return summary(f"ASGI {url}", durations, time.perf_counter() - start)
@@ -0,0 +1,63 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs benchmark once per database setup, each in its own process since DATABASES is
+# read at startup, and prints requests/sec per route side by side. The PostgreSQL setups
+# use the SOFTDESK_DB_NAME/USER/PASSWORD/HOST/PORT of the environment, and expect
+# generate_data to have run against that database as well.
+
+SETUPS = {
+    'sqlite-delete': {'SOFTDESK_DB_ENGINE': 'sqlite', 'SOFTDESK_SQLITE_JOURNAL_MODE': 'DELETE',
+                      'SOFTDESK_SQLITE_SYNCHRONOUS': 'FULL', 'SOFTDESK_DB_CONN_MAX_AGE': '0'},
+    'sqlite-wal': {'SOFTDESK_DB_ENGINE': 'sqlite', 'SOFTDESK_SQLITE_JOURNAL_MODE': 'WAL',
+                   'SOFTDESK_SQLITE_SYNCHRONOUS': 'NORMAL', 'SOFTDESK_DB_CONN_MAX_AGE': '0'},
+    'sqlite-wal-persistent': {'SOFTDESK_DB_ENGINE': 'sqlite', 'SOFTDESK_SQLITE_JOURNAL_MODE': 'WAL',
+                              'SOFTDESK_SQLITE_SYNCHRONOUS': 'NORMAL', 'SOFTDESK_DB_CONN_MAX_AGE': '60'},
+    'postgresql': {'SOFTDESK_DB_ENGINE': 'postgresql', 'SOFTDESK_DB_CONN_MAX_AGE': '0'},
+    'postgresql-persistent': {'SOFTDESK_DB_ENGINE': 'postgresql', 'SOFTDESK_DB_CONN_MAX_AGE': '60'},
+    'postgresql-pool': {'SOFTDESK_DB_ENGINE': 'postgresql-pool', 'SOFTDESK_DB_CONN_MAX_AGE': '0'},
+}
+
+
+class Command(BaseCommand):
+    help = "Compare requests/sec per route across SQLite journal modes, persistent and pooled connections"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--setups', nargs='+', choices=SETUPS,
+                            default=['sqlite-delete', 'sqlite-wal', 'sqlite-wal-persistent'])
+        parser.add_argument('--routes', nargs='+', default=['project-list', 'comment-detail', 'comment-create'])
+        parser.add_argument('--requests', type=int, default=300)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--output', help="save every run to this JSON file")
+
+    def handle(self, *args, **options):
+        runs = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for setup in options['setups']:
+                path = os.path.join(directory, f'{setup}.json')
+                command = [
+                    sys.executable, str(settings.BASE_DIR / 'manage.py'), 'benchmark',
+                    '--requests', str(options['requests']), '--concurrency', str(options['concurrency']),
+                    '--routes', *options['routes'], '--output', path,
+                ]
+                result = subprocess.run(command, env={**os.environ, **SETUPS[setup]}, capture_output=True, text=True)
+                if result.returncode:
+                    raise CommandError(f"{setup} failed:\n{result.stderr}")
+                with open(path) as output:
+                    runs[setup] = json.load(output)
+
+        self.stdout.write(f"{'req/s':<22}" + ''.join(f'{route:>16}' for route in options['routes']))
+        for setup, run in runs.items():
+            self.stdout.write(f'{setup:<22}' + ''.join(
+                f"{run['routes'][route]['requests_per_second']:>16.1f}" for route in options['routes']
+            ))
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(runs, output, indent=2)
+            self.stdout.write(f"Saved to {options['output']}")
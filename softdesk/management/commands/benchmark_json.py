@@ -0,0 +1,69 @@
+import timeit
+from datetime import date
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+from accounts.models import User
+from softdesk.fastpath import ISSUE_LIST
+from softdesk.models import Issue, Project, ProjectContributor
+from softdesk.parsers import FastJSONParser
+from softdesk.renderers import FastJSONRenderer, orjson
+from softdesk.serializers import IssueListSerializer
+from softdesk.views import ProjectView, annotate_issue_counts
+
+# Renders and parses one ProjectView.retrieve page of 50 issues with DRF's stdlib json
+# classes and with the fast ones, and serializes its issues with IssueListSerializer and
+# with the compiled fast path. The page is built in a transaction that is rolled back.
+
+
+class Command(BaseCommand):
+    help = "Time serializing, rendering and parsing a 50-issue project page, before and after"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write("orjson is not installed, FastJSONRenderer falls back to the stdlib json")
+
+        data, issues, rows = self.project_page()
+        payload = JSONRenderer().render(data)
+        self.stdout.write(f"payload: {len(payload)} bytes, {options['repeat']} runs each")
+
+        repeat = options['repeat']
+        cases = [
+            ('serialize', lambda: IssueListSerializer(issues, many=True).data, lambda: ISSUE_LIST.render(rows)),
+            ('render', lambda: JSONRenderer().render(data), lambda: FastJSONRenderer().render(data)),
+            ('parse', lambda: JSONParser().parse(BytesIO(payload)), lambda: FastJSONParser().parse(BytesIO(payload))),
+        ]
+        for label, before, after in cases:
+            slow = timeit.timeit(before, number=repeat) / repeat
+            fast = timeit.timeit(after, number=repeat) / repeat
+            self.stdout.write(
+                f"{label:<9} before {slow * 1e6:>8.1f} us   after {fast * 1e6:>8.1f} us   x{slow / fast:.1f}"
+            )
+
+    def project_page(self):
+        with transaction.atomic():
+            user = User.objects.create(username='benchmark-json', date_of_birth=date(1990, 1, 1))
+            project = Project.objects.create(creator=user, name='benchmark', description='d' * 200,
+                                             project_type='web')
+            ProjectContributor.objects.create(project=project, contributor=user)
+            Issue.objects.bulk_create([
+                Issue(project=project, creator=user, assigned_to=user, name=f'issue {i}',
+                      description='Steps to reproduce: ' + 'lorem ipsum dolor sit amet ' * 10, priority='low')
+                for i in range(50)
+            ])
+
+            request = APIRequestFactory().get(f'/api/project/{project.id}/', {'page_size': 50})
+            force_authenticate(request, user)
+            data = ProjectView.as_view()(request, id=project.id).data
+            issues = annotate_issue_counts(project.issue_set.select_related('creator', 'assigned_to'))
+            rows = list(ISSUE_LIST.values(issues))
+            issues = list(issues)
+            transaction.set_rollback(True)
+        return data, issues, rows
@@ -0,0 +1,126 @@
+import random
+import time
+from datetime import date
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from accounts.models import User
+from softdesk.models import Comment, Issue, Project, ProjectContributor
+
+# Synthetic data at production scale, with bulk inserts. Sizes follow a Zipf-like
+# skew: a few projects hold most of the contributors and issues, most projects are
+# small, and a few issues hold most of the comments. Every user gets the same
+# password (hashed once), so that benchmark can log them in.
+
+WORDS = ('crash', 'login', 'export', 'slow', 'page', 'button', 'api', 'timeout', 'report', 'sync',
+         'mobile', 'search', 'upload', 'email', 'cache', 'layout', 'token', 'database', 'error', 'form')
+
+
+def skewed_weights(count, skew, rng):
+    # weight 1/rank^skew, ranks shuffled so that ids do not give the big ones away
+    weights = [1 / rank ** skew for rank in range(1, count + 1)]
+    rng.shuffle(weights)
+    return weights
+
+
+def sentence(rng, length):
+    return ' '.join(rng.choice(WORDS) for _ in range(length)).capitalize()
+
+
+class Command(BaseCommand):
+    help = "Generate users, projects, contributors, issues and comments with a realistic skew"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--projects', type=int, default=200)
+        parser.add_argument('--contributors', type=int, default=3000,
+                            help="memberships besides the project creators")
+        parser.add_argument('--issues', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=60000)
+        parser.add_argument('--skew', type=float, default=1.1, help="Zipf exponent, 0 for uniform sizes")
+        parser.add_argument('--password', default='benchmark', help="password of every generated user")
+        parser.add_argument('--prefix', default='bench', help="username prefix, must not be taken yet")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['projects'] < 1:
+            raise CommandError("--users and --projects must be at least 1")
+        if User.objects.filter(username__startswith=f"{options['prefix']}-").exists():
+            raise CommandError(f"Users named {options['prefix']}-* already exist, pick another --prefix")
+
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        start = time.perf_counter()
+        with transaction.atomic():
+            users = self.create_users(options, batch_size)
+            projects = self.create_projects(rng, users, options, batch_size)
+            members = self.create_contributors(rng, users, projects, options, batch_size)
+            issues = self.create_issues(rng, projects, members, options, batch_size)
+            self.create_comments(rng, issues, members, options, batch_size)
+        self.stdout.write(f"Done in {time.perf_counter() - start:.1f}s")
+
+    def report(self, label, count):
+        self.stdout.write(f"{label:<13} {count:>9}")
+
+    def create_users(self, options, batch_size):
+        password = make_password(options['password'])
+        users = User.objects.bulk_create([
+            User(username=f"{options['prefix']}-{i}", password=password, date_of_birth=date(1990, 1, 1))
+            for i in range(options['users'])
+        ], batch_size=batch_size)
+        self.report('users', len(users))
+        return users
+
+    def create_projects(self, rng, users, options, batch_size):
+        types = [value for value, _ in Project.TYPE_CHOICES]
+        projects = Project.objects.bulk_create([
+            Project(creator=rng.choice(users), name=sentence(rng, 3), description=sentence(rng, 20),
+                    project_type=rng.choice(types))
+            for _ in range(options['projects'])
+        ], batch_size=batch_size)
+        self.report('projects', len(projects))
+        return projects
+
+    def create_contributors(self, rng, users, projects, options, batch_size):
+        # {project: [contributors]}, the creator first
+        members = {project: [project.creator] for project in projects}
+        weights = skewed_weights(len(projects), options['skew'], rng)
+        for project in rng.choices(projects, weights, k=options['contributors']):
+            user = rng.choice(users)
+            if user not in members[project]:
+                members[project].append(user)
+        ProjectContributor.objects.bulk_create([
+            ProjectContributor(project=project, contributor=user)
+            for project, contributors in members.items() for user in contributors
+        ], batch_size=batch_size)
+        self.report('contributors', sum(len(contributors) for contributors in members.values()))
+        return members
+
+    def create_issues(self, rng, projects, members, options, batch_size):
+        choices = {
+            field: [value for value, _ in getattr(Issue, f'{field.upper()}_CHOICES')]
+            for field in ('status', 'priority', 'tag')
+        }
+        weights = skewed_weights(len(projects), options['skew'], rng)
+        issues = Issue.objects.bulk_create([
+            Issue(project=project, creator=rng.choice(members[project]), assigned_to=rng.choice(members[project]),
+                  name=sentence(rng, 4), description=sentence(rng, 30),
+                  **{field: rng.choice(values) for field, values in choices.items()})
+            for project in rng.choices(projects, weights, k=options['issues'])
+        ], batch_size=batch_size)
+        self.report('issues', len(issues))
+        return issues
+
+    def create_comments(self, rng, issues, members, options, batch_size):
+        if not issues:
+            self.report('comments', 0)
+            return
+        # issue.project is the cached instance the issue was built with, no query
+        weights = skewed_weights(len(issues), options['skew'], rng)
+        comments = Comment.objects.bulk_create([
+            Comment(issue=issue, creator=rng.choice(members[issue.project]), comment=sentence(rng, 15))
+            for issue in rng.choices(issues, weights, k=options['comments'])
+        ], batch_size=batch_size)
+        self.report('comments', len(comments))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from softdesk import stats
+
+
+class Command(BaseCommand):
+    help = "Recount the issue and comment counters behind the project stats endpoint"
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_ids', nargs='*', type=int, help="only these projects (default: all)")
+
+    def handle(self, *args, **options):
+        project_ids = options['project_ids'] or None
+        stats.rebuild(project_ids)
+        scope = f"projects {', '.join(map(str, project_ids))}" if project_ids else "all projects"
+        self.stdout.write(f"Rebuilt the stats of {scope}")
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from softdesk import caching
+
+
+class Command(BaseCommand):
+    help = "Show the hit/miss counters of the project response cache"
+
+    def handle(self, *args, **options):
+        counters = caching.stats()
+        total = counters['hits'] + counters['misses']
+        ratio = counters['hits'] / total * 100 if total else 0
+        self.stdout.write(f"hits: {counters['hits']}  misses: {counters['misses']}  hit ratio: {ratio:.1f}%")
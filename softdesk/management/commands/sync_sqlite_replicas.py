@@ -0,0 +1,42 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from softdesk.replicas import get_settings
+
+# Stands in for replication when the primary and its replicas are local SQLite files:
+# copies the primary into every SOFTDESK_READ_REPLICAS database with SQLite's online
+# backup, which readers of the primary do not wait for. Run it again, or with --every,
+# to let the replicas catch up.
+
+
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database into the SQLite read replicas"
+    # serves no request, softdesk.E001 does not concern it
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float, help="keep copying, every this many seconds")
+
+    def handle(self, *args, **options):
+        aliases = get_settings()['ALIASES']
+        if not aliases:
+            raise CommandError("No read replicas, set SOFTDESK_DB_REPLICAS")
+        for alias in ['default', *aliases]:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f"{alias} is not an SQLite database")
+
+        while True:
+            with sqlite3.connect(connections['default'].settings_dict['NAME']) as primary:
+                for alias in aliases:
+                    # the replica's own connection may hold an open read
+                    connections[alias].close()
+                    with sqlite3.connect(connections[alias].settings_dict['NAME']) as replica:
+                        primary.backup(replica)
+                    replica.close()
+            primary.close()
+            self.stdout.write(f"Copied the primary into {', '.join(aliases)}")
+            if not options['every']:
+                return
+            time.sleep(options['every'])
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from softdesk import timing
+
+
+class Command(BaseCommand):
+    help = "Show per-route p50/p95/p99 of the requests sampled by TimingMiddleware"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="forget the samples once shown")
+
+    def handle(self, *args, **options):
+        summary = timing.report()
+        if not summary:
+            self.stdout.write("No samples, is SOFTDESK_TIMING['ENABLED'] set with a shared cache?")
+        for route, metrics in summary.items():
+            self.stdout.write(f"{route}  ({metrics['count']} requests)")
+            for metric in timing.METRICS:
+                unit = '' if metric == 'queries' else ' ms'
+                values = '  '.join(f"{name} {value}{unit}" for name, value in metrics[metric].items())
+                self.stdout.write(f"    {metric:<11} {values}")
+        if options['reset']:
+            timing.reset()
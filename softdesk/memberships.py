@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.core.cache import cache
+from .models import ProjectContributor
+
+
+def cache_key(user_id):
+    return f'softdesk:memberships:{user_id}'
+
+
+def load_project_ids(user_id):
+    # shared cache, only used when SOFTDESK_MEMBERSHIP_CACHE_TIMEOUT is set
+    timeout = getattr(settings, 'SOFTDESK_MEMBERSHIP_CACHE_TIMEOUT', 0)
+    if timeout:
+        project_ids = cache.get(cache_key(user_id))
+        if project_ids is not None:
+            return project_ids
+
+    project_ids = frozenset(
+        ProjectContributor.objects.filter(contributor_id=user_id).values_list('project_id', flat=True)
+    )
+    if timeout:
+        cache.set(cache_key(user_id), project_ids, timeout)
+    return project_ids
+
+
+async def aload_project_ids(user_id):
+    # async twin of load_project_ids, for the ASGI views
+    timeout = getattr(settings, 'SOFTDESK_MEMBERSHIP_CACHE_TIMEOUT', 0)
+    if timeout:
+        project_ids = await cache.aget(cache_key(user_id))
+        if project_ids is not None:
+            return project_ids
+
+    project_ids = frozenset([
+        project_id async for project_id in
+        ProjectContributor.objects.filter(contributor_id=user_id).values_list('project_id', flat=True)
+    ])
+    if timeout:
+        await cache.aset(cache_key(user_id), project_ids, timeout)
+    return project_ids
+
+
+def get_project_ids(request):
+    # ids of the projects the user contributes to, loaded at most once per request
+    http_request = getattr(request, '_request', request)
+    project_ids = getattr(http_request, '_softdesk_project_ids', None)
+    if project_ids is None:
+        project_ids = load_project_ids(request.user.id)
+        http_request._softdesk_project_ids = project_ids
+    return project_ids
+
+
+async def aget_project_ids(request):
+    project_ids = getattr(request, '_softdesk_project_ids', None)
+    if project_ids is None:
+        project_ids = await aload_project_ids(request.user.id)
+        request._softdesk_project_ids = project_ids
+    return project_ids
+
+
+def is_contributor(request, project_id):
+    return project_id in get_project_ids(request)
+
+
+def forget_memberships(request, *user_ids):
+    # to call whenever contributors are added to or removed from a project
+    http_request = getattr(request, '_request', request)
+    if request.user.id in user_ids and hasattr(http_request, '_softdesk_project_ids'):
+        del http_request._softdesk_project_ids
+    cache.delete_many([cache_key(user_id) for user_id in user_ids])
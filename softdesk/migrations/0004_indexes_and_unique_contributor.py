@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def remove_duplicate_contributors(apps, schema_editor):
+    # keep the first row of each (project, contributor) pair so the unique constraint can be created
+    ProjectContributor = apps.get_model('softdesk', 'ProjectContributor')
+    seen = set()
+    duplicates = []
+    for pk, project_id, contributor_id in ProjectContributor.objects.order_by('id').values_list(
+            'id', 'project_id', 'contributor_id'):
+        if (project_id, contributor_id) in seen:
+            duplicates.append(pk)
+        seen.add((project_id, contributor_id))
+    ProjectContributor.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('softdesk', '0003_alter_issue_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['issue', 'created_at', 'id'], name='comment_issue_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['project', 'created_at', 'id'], name='issue_project_created_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_contributors, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='projectcontributor',
+            constraint=models.UniqueConstraint(fields=('project', 'contributor'), name='unique_project_contributor'),
+        ),
+    ]
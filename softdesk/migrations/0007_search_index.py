@@ -0,0 +1,101 @@
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE softdesk_search USING fts5(
+        title, body, project_id UNINDEXED, issue_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    # issues live under rowid 2 * id, comments under 2 * id + 1
+    """
+    CREATE TRIGGER softdesk_search_issue_insert AFTER INSERT ON softdesk_issue BEGIN
+        INSERT INTO softdesk_search (rowid, title, body, project_id, issue_id)
+        VALUES (new.id * 2, new.name, new.description, new.project_id, new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER softdesk_search_issue_update AFTER UPDATE OF name, description, project_id ON softdesk_issue BEGIN
+        UPDATE softdesk_search SET title = new.name, body = new.description, project_id = new.project_id
+        WHERE rowid = new.id * 2;
+        UPDATE softdesk_search SET project_id = new.project_id
+        WHERE new.project_id != old.project_id AND rowid IN (
+            SELECT id * 2 + 1 FROM softdesk_comment WHERE issue_id = new.id
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER softdesk_search_issue_delete AFTER DELETE ON softdesk_issue BEGIN
+        DELETE FROM softdesk_search WHERE rowid = old.id * 2;
+    END
+    """,
+    """
+    CREATE TRIGGER softdesk_search_comment_insert AFTER INSERT ON softdesk_comment BEGIN
+        INSERT INTO softdesk_search (rowid, title, body, project_id, issue_id)
+        VALUES (new.id * 2 + 1, '', new.comment,
+                (SELECT project_id FROM softdesk_issue WHERE id = new.issue_id), new.issue_id);
+    END
+    """,
+    """
+    CREATE TRIGGER softdesk_search_comment_update AFTER UPDATE OF comment ON softdesk_comment BEGIN
+        UPDATE softdesk_search SET body = new.comment WHERE rowid = new.id * 2 + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER softdesk_search_comment_delete AFTER DELETE ON softdesk_comment BEGIN
+        DELETE FROM softdesk_search WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+    # index what already exists
+    """
+    INSERT INTO softdesk_search (rowid, title, body, project_id, issue_id)
+    SELECT id * 2, name, description, project_id, id FROM softdesk_issue
+    """,
+    """
+    INSERT INTO softdesk_search (rowid, title, body, project_id, issue_id)
+    SELECT c.id * 2 + 1, '', c.comment, i.project_id, c.issue_id
+    FROM softdesk_comment c JOIN softdesk_issue i ON i.id = c.issue_id
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER softdesk_search_issue_insert",
+    "DROP TRIGGER softdesk_search_issue_update",
+    "DROP TRIGGER softdesk_search_issue_delete",
+    "DROP TRIGGER softdesk_search_comment_insert",
+    "DROP TRIGGER softdesk_search_comment_update",
+    "DROP TRIGGER softdesk_search_comment_delete",
+    "DROP TABLE softdesk_search",
+]
+
+# must match the expressions of softdesk.search.POSTGRESQL_QUERY to be used
+POSTGRESQL_FORWARD = [
+    "CREATE INDEX issue_search_idx ON softdesk_issue USING gin (to_tsvector('english', name || ' ' || description))",
+    "CREATE INDEX comment_search_idx ON softdesk_comment USING gin (to_tsvector('english', comment))",
+]
+
+POSTGRESQL_BACKWARD = [
+    "DROP INDEX issue_search_idx",
+    "DROP INDEX comment_search_idx",
+]
+
+
+def run(statements):
+    def apply(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('softdesk', '0006_project_list_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD}),
+            run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRESQL_BACKWARD}),
+        ),
+    ]
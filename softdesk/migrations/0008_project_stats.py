@@ -0,0 +1,189 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# the old row of an issue is counted out, the new one counted in
+OLD_ISSUE_STATS = """
+    UPDATE softdesk_projectstat SET total = total - 1
+    WHERE project_id = {old}.project_id AND (
+        (field = 'status' AND value = {old}.status)
+        OR (field = 'priority' AND value = {old}.priority)
+        OR (field = 'tag' AND value = {old}.tag)
+    )
+"""
+
+NEW_ISSUE_STATS = """
+    INSERT INTO softdesk_projectstat (project_id, field, value, total)
+    VALUES ({new}.project_id, 'status', {new}.status, 1),
+           ({new}.project_id, 'priority', {new}.priority, 1),
+           ({new}.project_id, 'tag', {new}.tag, 1)
+    ON CONFLICT (project_id, field, value) DO UPDATE SET total = softdesk_projectstat.total + 1
+"""
+
+# count what already exists, the same way on both backends
+BACKFILL = [
+    """
+    INSERT INTO softdesk_projectstat (project_id, field, value, total)
+    SELECT project_id, 'status', status, COUNT(*) FROM softdesk_issue GROUP BY project_id, status
+    UNION ALL
+    SELECT project_id, 'priority', priority, COUNT(*) FROM softdesk_issue GROUP BY project_id, priority
+    UNION ALL
+    SELECT project_id, 'tag', tag, COUNT(*) FROM softdesk_issue GROUP BY project_id, tag
+    """,
+    """
+    INSERT INTO softdesk_issuestat (issue_id, project_id, comment_count)
+    SELECT i.id, i.project_id, (SELECT COUNT(*) FROM softdesk_comment c WHERE c.issue_id = i.id)
+    FROM softdesk_issue i
+    """,
+]
+
+SQLITE_FORWARD = [
+    f"""
+    CREATE TRIGGER softdesk_stats_issue_insert AFTER INSERT ON softdesk_issue BEGIN
+        {NEW_ISSUE_STATS.format(new='new')};
+        INSERT INTO softdesk_issuestat (issue_id, project_id, comment_count) VALUES (new.id, new.project_id, 0);
+    END
+    """,
+    f"""
+    CREATE TRIGGER softdesk_stats_issue_update AFTER UPDATE OF status, priority, tag, project_id ON softdesk_issue
+    WHEN old.status != new.status OR old.priority != new.priority OR old.tag != new.tag
+        OR old.project_id != new.project_id
+    BEGIN
+        {OLD_ISSUE_STATS.format(old='old')};
+        {NEW_ISSUE_STATS.format(new='new')};
+        UPDATE softdesk_issuestat SET project_id = new.project_id WHERE issue_id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER softdesk_stats_issue_delete AFTER DELETE ON softdesk_issue BEGIN
+        {OLD_ISSUE_STATS.format(old='old')};
+        DELETE FROM softdesk_issuestat WHERE issue_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER softdesk_stats_comment_insert AFTER INSERT ON softdesk_comment BEGIN
+        UPDATE softdesk_issuestat SET comment_count = comment_count + 1 WHERE issue_id = new.issue_id;
+    END
+    """,
+    """
+    CREATE TRIGGER softdesk_stats_comment_update AFTER UPDATE OF issue_id ON softdesk_comment
+    WHEN old.issue_id != new.issue_id
+    BEGIN
+        UPDATE softdesk_issuestat SET comment_count = comment_count - 1 WHERE issue_id = old.issue_id;
+        UPDATE softdesk_issuestat SET comment_count = comment_count + 1 WHERE issue_id = new.issue_id;
+    END
+    """,
+    """
+    CREATE TRIGGER softdesk_stats_comment_delete AFTER DELETE ON softdesk_comment BEGIN
+        UPDATE softdesk_issuestat SET comment_count = comment_count - 1 WHERE issue_id = old.issue_id;
+    END
+    """,
+] + BACKFILL
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER softdesk_stats_issue_insert",
+    "DROP TRIGGER softdesk_stats_issue_update",
+    "DROP TRIGGER softdesk_stats_issue_delete",
+    "DROP TRIGGER softdesk_stats_comment_insert",
+    "DROP TRIGGER softdesk_stats_comment_update",
+    "DROP TRIGGER softdesk_stats_comment_delete",
+]
+
+POSTGRESQL_FORWARD = [
+    f"""
+    CREATE FUNCTION softdesk_stats_issue() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP <> 'INSERT' THEN
+            {OLD_ISSUE_STATS.format(old='OLD')};
+        END IF;
+        IF TG_OP <> 'DELETE' THEN
+            {NEW_ISSUE_STATS.format(new='NEW')};
+        END IF;
+        IF TG_OP = 'INSERT' THEN
+            INSERT INTO softdesk_issuestat (issue_id, project_id, comment_count) VALUES (NEW.id, NEW.project_id, 0);
+        ELSIF TG_OP = 'UPDATE' THEN
+            UPDATE softdesk_issuestat SET project_id = NEW.project_id WHERE issue_id = NEW.id;
+        ELSE
+            DELETE FROM softdesk_issuestat WHERE issue_id = OLD.id;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER softdesk_stats_issue
+    AFTER INSERT OR DELETE OR UPDATE OF status, priority, tag, project_id ON softdesk_issue
+    FOR EACH ROW EXECUTE FUNCTION softdesk_stats_issue()
+    """,
+    """
+    CREATE FUNCTION softdesk_stats_comment() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP <> 'INSERT' THEN
+            UPDATE softdesk_issuestat SET comment_count = comment_count - 1 WHERE issue_id = OLD.issue_id;
+        END IF;
+        IF TG_OP <> 'DELETE' THEN
+            UPDATE softdesk_issuestat SET comment_count = comment_count + 1 WHERE issue_id = NEW.issue_id;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER softdesk_stats_comment
+    AFTER INSERT OR DELETE OR UPDATE OF issue_id ON softdesk_comment
+    FOR EACH ROW EXECUTE FUNCTION softdesk_stats_comment()
+    """,
+] + BACKFILL
+
+POSTGRESQL_BACKWARD = [
+    "DROP TRIGGER softdesk_stats_issue ON softdesk_issue",
+    "DROP TRIGGER softdesk_stats_comment ON softdesk_comment",
+    "DROP FUNCTION softdesk_stats_issue()",
+    "DROP FUNCTION softdesk_stats_comment()",
+]
+
+
+def run(statements):
+    def apply(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('softdesk', '0007_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IssueStat',
+            fields=[
+                ('issue', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, serialize=False, to='softdesk.issue')),
+                ('comment_count', models.IntegerField(default=0)),
+                ('project', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to='softdesk.project')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProjectStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(choices=[('status', 'Status'), ('priority', 'Priority'), ('tag', 'Tag')], max_length=20)),
+                ('value', models.CharField(max_length=50)),
+                ('total', models.IntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='softdesk.project')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='projectstat',
+            constraint=models.UniqueConstraint(fields=('project', 'field', 'value'), name='unique_project_stat'),
+        ),
+        # other backends have no triggers, their counters are as fresh as the last rebuild_project_stats
+        migrations.RunPython(
+            run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD}),
+            run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRESQL_BACKWARD}),
+        ),
+    ]
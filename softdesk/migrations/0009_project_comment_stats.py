@@ -0,0 +1,146 @@
+from django.db import migrations, models
+
+
+# the comment counter of a project is a softdesk_projectstat row, field 'comments' and value ''
+COUNT_IN = """
+    INSERT INTO softdesk_projectstat (project_id, field, value, total)
+    SELECT project_id, 'comments', '', {count} FROM softdesk_issue WHERE id = {issue}
+    ON CONFLICT (project_id, field, value) DO UPDATE SET total = softdesk_projectstat.total + excluded.total
+"""
+
+COUNT_OUT = """
+    UPDATE softdesk_projectstat SET total = total - {count}
+    WHERE field = 'comments' AND value = '' AND project_id = {project}
+"""
+
+# the comments an issue still has when it is deleted or moved to another project;
+# deleting an issue through the ORM deletes its comments first, this is 0 then
+ISSUE_COMMENTS = "(SELECT COUNT(*) FROM softdesk_comment WHERE issue_id = {issue})"
+
+# the comment of a deleted issue has no project left to count it out of
+COMMENT_PROJECT = "(SELECT project_id FROM softdesk_issue WHERE id = {issue})"
+
+BACKFILL = [
+    """
+    INSERT INTO softdesk_projectstat (project_id, field, value, total)
+    SELECT i.project_id, 'comments', '', COUNT(*)
+    FROM softdesk_comment c JOIN softdesk_issue i ON i.id = c.issue_id
+    GROUP BY i.project_id
+    """,
+]
+
+SQLITE_FORWARD = [
+    f"""
+    CREATE TRIGGER softdesk_stats_project_comments_issue_update AFTER UPDATE OF project_id ON softdesk_issue
+    WHEN old.project_id != new.project_id
+    BEGIN
+        {COUNT_OUT.format(count=ISSUE_COMMENTS.format(issue='new.id'), project='old.project_id')};
+        {COUNT_IN.format(count=ISSUE_COMMENTS.format(issue='new.id'), issue='new.id')};
+    END
+    """,
+    f"""
+    CREATE TRIGGER softdesk_stats_project_comments_issue_delete AFTER DELETE ON softdesk_issue BEGIN
+        {COUNT_OUT.format(count=ISSUE_COMMENTS.format(issue='old.id'), project='old.project_id')};
+    END
+    """,
+    f"""
+    CREATE TRIGGER softdesk_stats_project_comments_insert AFTER INSERT ON softdesk_comment BEGIN
+        {COUNT_IN.format(count=1, issue='new.issue_id')};
+    END
+    """,
+    f"""
+    CREATE TRIGGER softdesk_stats_project_comments_update AFTER UPDATE OF issue_id ON softdesk_comment
+    WHEN old.issue_id != new.issue_id
+    BEGIN
+        {COUNT_OUT.format(count=1, project=COMMENT_PROJECT.format(issue='old.issue_id'))};
+        {COUNT_IN.format(count=1, issue='new.issue_id')};
+    END
+    """,
+    f"""
+    CREATE TRIGGER softdesk_stats_project_comments_delete AFTER DELETE ON softdesk_comment BEGIN
+        {COUNT_OUT.format(count=1, project=COMMENT_PROJECT.format(issue='old.issue_id'))};
+    END
+    """,
+] + BACKFILL
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER softdesk_stats_project_comments_issue_update",
+    "DROP TRIGGER softdesk_stats_project_comments_issue_delete",
+    "DROP TRIGGER softdesk_stats_project_comments_insert",
+    "DROP TRIGGER softdesk_stats_project_comments_update",
+    "DROP TRIGGER softdesk_stats_project_comments_delete",
+    "DELETE FROM softdesk_projectstat WHERE field = 'comments'",
+]
+
+POSTGRESQL_FORWARD = [
+    f"""
+    CREATE FUNCTION softdesk_stats_project_comments_issue() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            {COUNT_OUT.format(count=ISSUE_COMMENTS.format(issue='OLD.id'), project='OLD.project_id')};
+        ELSIF OLD.project_id <> NEW.project_id THEN
+            {COUNT_OUT.format(count=ISSUE_COMMENTS.format(issue='NEW.id'), project='OLD.project_id')};
+            {COUNT_IN.format(count=ISSUE_COMMENTS.format(issue='NEW.id'), issue='NEW.id')};
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER softdesk_stats_project_comments_issue
+    AFTER DELETE OR UPDATE OF project_id ON softdesk_issue
+    FOR EACH ROW EXECUTE FUNCTION softdesk_stats_project_comments_issue()
+    """,
+    f"""
+    CREATE FUNCTION softdesk_stats_project_comments() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP <> 'INSERT' THEN
+            {COUNT_OUT.format(count=1, project=COMMENT_PROJECT.format(issue='OLD.issue_id'))};
+        END IF;
+        IF TG_OP <> 'DELETE' THEN
+            {COUNT_IN.format(count=1, issue='NEW.issue_id')};
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER softdesk_stats_project_comments
+    AFTER INSERT OR DELETE OR UPDATE OF issue_id ON softdesk_comment
+    FOR EACH ROW EXECUTE FUNCTION softdesk_stats_project_comments()
+    """,
+] + BACKFILL
+
+POSTGRESQL_BACKWARD = [
+    "DROP TRIGGER softdesk_stats_project_comments_issue ON softdesk_issue",
+    "DROP TRIGGER softdesk_stats_project_comments ON softdesk_comment",
+    "DROP FUNCTION softdesk_stats_project_comments_issue()",
+    "DROP FUNCTION softdesk_stats_project_comments()",
+    "DELETE FROM softdesk_projectstat WHERE field = 'comments'",
+]
+
+
+def run(statements):
+    def apply(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('softdesk', '0008_project_stats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='projectstat',
+            name='field',
+            field=models.CharField(choices=[('status', 'Status'), ('priority', 'Priority'), ('tag', 'Tag'), ('comments', 'Comments')], max_length=20),
+        ),
+        migrations.RunPython(
+            run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD}),
+            run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRESQL_BACKWARD}),
+        ),
+    ]
@@ -22,6 +22,14 @@ class Project(models.Model):
     description = models.TextField()
     project_type = models.CharField(max_length=50, choices=TYPE_CHOICES)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # filters of the project list
+        indexes = [
+            models.Index(fields=['project_type', 'created_at'], name='project_type_created_idx'),
+            models.Index(fields=['created_at'], name='project_created_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -32,6 +40,16 @@ class ProjectContributor(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
     contributor = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    class Meta:
+        # also serves as the (project, contributor) index of the permission checks
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'contributor'], name='unique_project_contributor'),
+        ]
+        # the other way round, for the projects of a user
+        indexes = [
+            models.Index(fields=['contributor', 'project'], name='contributor_project_idx'),
+        ]
+
     def __str__(self):
         return f"{self.contributor.username} - {self.project.name}"
 
@@ -62,6 +80,12 @@ class Issue(models.Model):
     status = models.CharField(max_length=50, choices=STATUS_CHOICES, default='To Do')
     assigned_to = models.ForeignKey(User, on_delete=models.CASCADE, related_name='assigned_to')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'created_at', 'id'], name='issue_project_created_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -72,6 +96,44 @@ class Comment(models.Model):
     issue = models.ForeignKey(Issue ,verbose_name="related issue" ,on_delete=models.CASCADE )
     comment = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
-    
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['issue', 'created_at', 'id'], name='comment_issue_created_idx'),
+        ]
+
+    def __str__(self):
+        return self.comment
+
+# issue counters of a project by status, priority and tag, maintained by the triggers of migration 0008,
+# and its comment counter (field 'comments', value ''), maintained by those of migration 0009
+class ProjectStat(models.Model):
+    FIELD_CHOICES = (
+        ('status', 'Status'),
+        ('priority', 'Priority'),
+        ('tag', 'Tag'),
+        ('comments', 'Comments'),
+    )
+    project = models.ForeignKey(Project, on_delete=models.CASCADE)
+    field = models.CharField(max_length=20, choices=FIELD_CHOICES)
+    value = models.CharField(max_length=50)
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'field', 'value'], name='unique_project_stat'),
+        ]
+
+    def __str__(self):
+        return f"{self.project_id} {self.field}={self.value}: {self.total}"
+
+
+# comment counter of an issue, maintained by the same triggers, which also delete it with its issue
+class IssueStat(models.Model):
+    issue = models.OneToOneField(Issue, primary_key=True, on_delete=models.DO_NOTHING, db_constraint=False)
+    project = models.ForeignKey(Project, on_delete=models.DO_NOTHING, db_constraint=False)
+    comment_count = models.IntegerField(default=0)
+
     def __str__(self):
-        return self.comment
\ No newline at end of file
+        return f"{self.issue_id}: {self.comment_count} comments"
@@ -1,6 +1,46 @@
-from rest_framework.pagination import PageNumberPagination
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 class CustomPagination(PageNumberPagination):
     page_size = 5
     page_size_query_param = 'page_size'
     max_page_size = 50
+
+
+class CustomCursorPagination(CursorPagination):
+    # keyset pagination on (created_at, id): no COUNT(*) and no OFFSET scan,
+    # so the last page costs the same as the first one
+    page_size = 5
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+    ordering = ('created_at', 'id')
+
+
+class PaginationModeMixin:
+    # ?pagination=cursor (or a ?cursor= link) switches a view to cursor pagination,
+    # SOFTDESK_PAGINATION_MODE = 'cursor' makes it the default
+    cursor_pagination_class = CustomCursorPagination
+
+    def use_cursor_pagination(self):
+        params = self.request.query_params
+        if 'cursor' in params:
+            return True
+        mode = params.get('pagination', getattr(settings, 'SOFTDESK_PAGINATION_MODE', 'page'))
+        return mode == 'cursor'
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.use_cursor_pagination():
+                self._paginator = self.cursor_pagination_class()
+            elif self.pagination_class is None:
+                self._paginator = None
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def paginate_queryset(self, queryset):
+        # pages need a stable order too: the cursor's, unless the view picked one
+        if not self.use_cursor_pagination() and not queryset.ordered:
+            queryset = queryset.order_by(*self.cursor_pagination_class.ordering)
+        return super().paginate_queryset(queryset)
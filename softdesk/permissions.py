@@ -1,6 +1,6 @@
 from rest_framework import permissions
 from rest_framework.permissions import BasePermission, SAFE_METHODS
-from .models import ProjectContributor
+from .memberships import is_contributor
 
 
 class ReadOnly(BasePermission):
@@ -10,7 +10,7 @@ class ReadOnly(BasePermission):
 class IsContributor(permissions.BasePermission):
     # must be a contributor to the project
     def has_object_permission(self, request, view, obj):
-        return ProjectContributor.objects.filter(project=obj, contributor=request.user).exists()
+        return is_contributor(request, obj.id)
 
 
 class IsCreator(permissions.BasePermission):
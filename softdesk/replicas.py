@@ -0,0 +1,100 @@
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import MiddlewareNotUsed
+from rest_framework.permissions import SAFE_METHODS
+
+# Read replicas for the read endpoints (project list, project, issue and comment details).
+# Their views are wrapped in replica_reads: a GET runs its queries on one of the
+# SOFTDESK_READ_REPLICAS['ALIASES'] databases, picked at random, unless the user wrote
+# something in the last PIN_SECONDS (ReadYourWritesMiddleware), in which case the replica
+# may not have caught up and the primary answers. The membership checks of these views
+# read the replica as well; authentication, writes and every other endpoint stay on the
+# primary. The pins are kept in the CACHE cache, which every worker must share.
+
+read_alias = ContextVar('softdesk_read_alias', default=None)
+
+
+def get_settings():
+    return {'ALIASES': [], 'PIN_SECONDS': 5, 'CACHE': 'default', **getattr(settings, 'SOFTDESK_READ_REPLICAS', {})}
+
+
+def get_cache():
+    return caches[get_settings()['CACHE']]
+
+
+def check_pin_cache(app_configs=None, **kwargs):
+    # a pin set by one worker must be seen by the others
+    options = get_settings()
+    if options['ALIASES'] and isinstance(get_cache(), (LocMemCache, DummyCache)):
+        return [checks.Error(
+            f"SOFTDESK_READ_REPLICAS['CACHE'] ({options['CACHE']!r}) is not shared between processes, "
+            "so a user's read after a write may be served by a lagging replica",
+            hint="Point it to a Redis or Memcached entry of CACHES, or silence softdesk.E001 "
+                 "when a single process serves every request",
+            id='softdesk.E001',
+        )]
+    return []
+
+
+def pin_key(user_id):
+    return f'softdesk:replicas:pinned:{user_id}'
+
+
+def pick_replica(request):
+    # None when the request must read the primary
+    options = get_settings()
+    if not options['ALIASES'] or request.method not in SAFE_METHODS:
+        return None
+    if request.user.is_authenticated and get_cache().get(pin_key(request.user.id)):
+        return None
+    return random.choice(options['ALIASES'])
+
+
+def replica_reads(view_method):
+    @wraps(view_method)
+    def wrapper(view, request, *args, **kwargs):
+        token = read_alias.set(pick_replica(request))
+        try:
+            return view_method(view, request, *args, **kwargs)
+        finally:
+            read_alias.reset(token)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        # None lets Django pick, i.e. the primary or the database of the hinted instance
+        return read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {'default', *get_settings()['ALIASES']}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReadYourWritesMiddleware:
+    # pins a user to the primary for PIN_SECONDS after each successful write
+    def __init__(self, get_response):
+        if not get_settings()['ALIASES']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        # DRF authenticates in the view, and sets request.user on this request too
+        user = getattr(request, 'user', None)
+        if request.method not in SAFE_METHODS and response.status_code < 400 and user is not None \
+                and user.is_authenticated:
+            get_cache().set(pin_key(user.id), True, get_settings()['PIN_SECONDS'])
+        return response
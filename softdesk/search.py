@@ -0,0 +1,98 @@
+from django.db import connection
+
+# Full-text search over issues and comments.
+#
+# SQLite: the softdesk_search FTS5 table (migration 0007) is kept up to date by
+# triggers on softdesk_issue and softdesk_comment, so every write path, bulk
+# inserts and cascading deletes included, maintains it. Issues are stored under
+# rowid = 2 * id and comments under rowid = 2 * id + 1.
+#
+# PostgreSQL: issues and comments are matched against to_tsvector() expressions
+# backed by GIN indexes created by the same migration.
+
+SQLITE_QUERY = """
+    SELECT s.rowid, s.project_id, s.issue_id, i.name,
+           snippet(softdesk_search, 1, '[', ']', '...', 12),
+           bm25(softdesk_search, 2.0, 1.0) AS rank
+    FROM softdesk_search s
+    JOIN softdesk_issue i ON i.id = s.issue_id
+    WHERE softdesk_search MATCH %s
+      AND s.project_id IN (SELECT project_id FROM softdesk_projectcontributor WHERE contributor_id = %s)
+    ORDER BY rank
+    LIMIT %s OFFSET %s
+"""
+
+# every match is ranked, but only the rows of the page get a ts_headline() snippet
+POSTGRESQL_QUERY = """
+    WITH q AS (SELECT websearch_to_tsquery('english', %s) AS query),
+    projects AS (SELECT project_id FROM softdesk_projectcontributor WHERE contributor_id = %s),
+    page AS (
+        SELECT * FROM (
+            SELECT 'issue' AS type, i.id, i.project_id, i.id AS issue_id, i.name AS issue_name,
+                   i.description AS text,
+                   ts_rank(to_tsvector('english', i.name || ' ' || i.description), q.query) AS rank
+            FROM softdesk_issue i, q
+            WHERE i.project_id IN (SELECT project_id FROM projects)
+              AND to_tsvector('english', i.name || ' ' || i.description) @@ q.query
+            UNION ALL
+            SELECT 'comment', c.id, i.project_id, i.id, i.name, c.comment,
+                   ts_rank(to_tsvector('english', c.comment), q.query)
+            FROM softdesk_comment c JOIN softdesk_issue i ON i.id = c.issue_id, q
+            WHERE i.project_id IN (SELECT project_id FROM projects)
+              AND to_tsvector('english', c.comment) @@ q.query
+        ) results
+        ORDER BY rank DESC, type, id
+        LIMIT %s OFFSET %s
+    )
+    SELECT page.type, page.id, page.project_id, page.issue_id, page.issue_name,
+           ts_headline('english', page.text, q.query) AS snippet, page.rank
+    FROM page, q
+    ORDER BY page.rank DESC, page.type, page.id
+"""
+
+
+def fts5_query(terms):
+    # every word becomes a quoted FTS5 string, so user input can never be read as query syntax
+    words = terms.split()
+    return ' '.join('"{}"'.format(word.replace('"', '""')) for word in words)
+
+
+def sqlite_search(user_id, terms, limit, offset):
+    with connection.cursor() as cursor:
+        cursor.execute(SQLITE_QUERY, [fts5_query(terms), user_id, limit, offset])
+        rows = cursor.fetchall()
+    return [{
+        'type': 'comment' if rowid % 2 else 'issue',
+        'id': rowid // 2,
+        'project_id': project_id,
+        'issue_id': issue_id,
+        'issue_name': issue_name,
+        'snippet': snippet,
+        # bm25() is lower for better matches, flip it so higher always means more relevant
+        'rank': -rank,
+    } for rowid, project_id, issue_id, issue_name, snippet, rank in rows]
+
+
+def postgresql_search(user_id, terms, limit, offset):
+    with connection.cursor() as cursor:
+        cursor.execute(POSTGRESQL_QUERY, [terms, user_id, limit, offset])
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+BACKENDS = {
+    'sqlite': sqlite_search,
+    'postgresql': postgresql_search,
+}
+
+
+def is_available():
+    return connection.vendor in BACKENDS
+
+
+def search(user_id, terms, limit, offset):
+    # ranked issues and comments matching terms in the projects of the user, check
+    # is_available() first
+    if not terms.split():
+        return []
+    return BACKENDS[connection.vendor](user_id, terms, limit, offset)
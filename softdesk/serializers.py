@@ -1,3 +1,4 @@
+from django.core.exceptions import FieldDoesNotExist
 from rest_framework import serializers
 from accounts.models import User
 
@@ -5,6 +6,100 @@ from accounts.serializers import UserSerializer
 from softdesk.models import Issue, Project, ProjectContributor, Comment
 
 
+# never deferred: primary keys, and the columns read by pagination cursors and conditional GET
+ALWAYS_LOADED = ('id', 'created_at', 'updated_at')
+
+
+def query_params(request):
+    # DRF requests and the plain Django requests of the async views
+    return getattr(request, 'query_params', request.GET)
+
+
+def endpoint_resource(context):
+    # the resource the endpoint is about, the one plain ?fields= applies to
+    if 'resource' in context:
+        return context['resource']
+    view = context.get('view')
+    return getattr(view.get_serializer_class(), 'resource', None) if view is not None else None
+
+
+def requested_fields(request, resource, endpoint):
+    # ?fields[issue]=id,name for every issue of the response, ?fields=id,name for the endpoint's own resource
+    if request is None:
+        return None
+    params = query_params(request)
+    value = params.get(f'fields[{resource}]')
+    if value is None and resource == endpoint:
+        value = params.get('fields')
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class UserSummarySerializer(serializers.ModelSerializer):
+    # what ?expand= shows of a user
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'first_name', 'last_name']
+
+
+class SparseFieldsMixin:
+    """
+    Sparse fieldsets and nested expansion for the read serializers.
+
+    ?fields=id,name keeps only those fields of the endpoint's own resource, ?fields[issue]=id,status
+    those of every issue in the response (project, issue and comment resources) and
+    ?expand=creator,assigned_to replaces usernames by user objects.
+    """
+    resource = None
+    # field name -> factory of the field replacing it when expanded
+    expandable = {}
+    # field name -> prefetch_related() lookup the views make for it
+    prefetched = {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None:
+            return fields
+
+        expand = {name.strip() for name in query_params(request).get('expand', '').split(',')}
+        for name in expand & fields.keys() & self.expandable.keys():
+            fields[name] = self.expandable[name]()
+
+        requested = requested_fields(request, self.resource, endpoint_resource(self.context))
+        if requested is not None:
+            fields = {name: field for name, field in fields.items() if name in requested}
+        return fields
+
+    @classmethod
+    def defer_unrequested(cls, queryset, request, endpoint):
+        # leave the columns and prefetched relations of the fields nobody asked for in the database
+        requested = requested_fields(request, cls.resource, endpoint)
+        if requested is None:
+            return queryset
+        unused = {lookup for name, lookup in cls.prefetched.items() if name not in requested}
+        if unused:
+            lookups = [
+                lookup for lookup in queryset._prefetch_related_lookups
+                if getattr(lookup, 'prefetch_through', lookup).split('__')[0] not in unused
+            ]
+            queryset = queryset.prefetch_related(None).prefetch_related(*lookups)
+        model = cls.Meta.model
+        deferred = []
+        for name, field in cls().get_fields().items():
+            source = field.source or name
+            if name in requested or source in ALWAYS_LOADED:
+                continue
+            try:
+                model_field = model._meta.get_field(source)
+            except FieldDoesNotExist:
+                continue
+            if model_field.concrete and not model_field.is_relation:
+                deferred.append(model_field.name)
+        return queryset.defer(*deferred)
+
+
 class ContributorSerializer(serializers.ModelSerializer):
     contributor = UserSerializer(source='contributor.contributor', read_only=True)
     class Meta:
@@ -19,17 +114,39 @@ class RemoveContributorSerializer(serializers.Serializer):
     username = serializers.CharField(help_text="Contributor username")
 
 
-class ProjectListSerializer(serializers.ModelSerializer):
+class BulkContributorsSerializer(serializers.Serializer):
+    usernames = serializers.ListField(
+        child=serializers.CharField(), allow_empty=False, max_length=1000,
+        help_text="Contributor usernames"
+    )
+
+
+class ProjectListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    resource = 'project'
+    expandable = {'creator': lambda: UserSummarySerializer(read_only=True)}
+
     creator = serializers.SerializerMethodField()
+    # annotated by the list queryset
+    contributor_count = serializers.IntegerField(read_only=True)
+    open_issue_count = serializers.IntegerField(read_only=True)
+
     def get_creator(self, instance):
         return instance.creator.username
 
     class Meta:
         model = Project
-        fields = '__all__'
+        fields = ['id', 'creator', 'contributor_count', 'open_issue_count', 'name', 'description', 'project_type',
+                  'created_at']
+
 
+class ProjectDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    resource = 'project'
+    expandable = {
+        'creator': lambda: UserSummarySerializer(read_only=True),
+        'contributors': lambda: serializers.SerializerMethodField(method_name='get_expanded_contributors'),
+    }
+    prefetched = {'contributors': 'projectcontributor_set'}
 
-class ProjectDetailSerializer(serializers.ModelSerializer):
     creator = serializers.SerializerMethodField()
     contributors = serializers.SerializerMethodField()
 
@@ -37,9 +154,14 @@ class ProjectDetailSerializer(serializers.ModelSerializer):
         return instance.creator.username
 
     def get_contributors(self, instance):
-        contributors = ProjectContributor.objects.filter(project=instance)
+        # relies on the view prefetching projectcontributor_set__contributor
+        contributors = instance.projectcontributor_set.all()
         return [contributor.contributor.username for contributor in contributors]
 
+    def get_expanded_contributors(self, instance):
+        contributors = [contributor.contributor for contributor in instance.projectcontributor_set.all()]
+        return UserSummarySerializer(contributors, many=True).data
+
     class Meta:
         model = Project
         fields = ['id', 'name', 'project_type', 'creator', 'created_at', 'description', 'contributors']
@@ -52,9 +174,17 @@ class ProjectSerializer(serializers.ModelSerializer):
         fields = ['name', 'description', 'project_type']
 
 
-class IssueListSerializer(serializers.ModelSerializer):
+class IssueListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    resource = 'issue'
+    expandable = {
+        'creator': lambda: UserSummarySerializer(read_only=True),
+        'assigned_to': lambda: UserSummarySerializer(read_only=True),
+    }
+
     creator = serializers.StringRelatedField(source='creator.username', read_only=True)
     assigned_to = serializers.SerializerMethodField()
+    # annotated by the querysets of the views
+    comment_count = serializers.IntegerField(read_only=True)
 
     def get_creator(self, instance):
         return instance.creator.username
@@ -64,7 +194,8 @@ class IssueListSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Issue
-        fields = ['id', 'name', 'description', 'creator', 'assigned_to', 'status', 'priority', 'tag', 'created_at']
+        fields = ['id', 'name', 'description', 'creator', 'assigned_to', 'status', 'priority', 'tag', 'created_at',
+                  'comment_count']
 
 
 class IssueSerializer(serializers.ModelSerializer):
@@ -79,7 +210,27 @@ class IssueSerializer(serializers.ModelSerializer):
         return instance.creator.username
     
 
-class CommentSerializer(serializers.ModelSerializer):
+class BulkIssueSerializer(serializers.Serializer):
+    # To create several issues of a project at once
+    issues = IssueSerializer(many=True, allow_empty=False, max_length=1000)
+
+
+class BatchIssueUpdateSerializer(serializers.Serializer):
+    # To move several issues to the same status and/or priority at once
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, help_text="Issue ids")
+    status = serializers.ChoiceField(choices=Issue.STATUS_CHOICES, required=False)
+    priority = serializers.ChoiceField(choices=Issue.PRIORITY_CHOICES, required=False)
+
+    def validate(self, data):
+        if 'status' not in data and 'priority' not in data:
+            raise serializers.ValidationError("Provide a status and/or a priority to apply.")
+        return data
+
+
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    resource = 'comment'
+    expandable = {'creator': lambda: UserSummarySerializer(read_only=True)}
+
     creator = serializers.StringRelatedField(source='creator.username', read_only=True)
     def get_creator(self, instance):
         return instance.creator.username
@@ -0,0 +1,75 @@
+from django.db import connection, transaction
+from django.db.models import Count
+from .models import Comment, Issue, IssueStat, ProjectStat
+
+# Issue and comment counters of every project (softdesk_projectstat), and comment
+# counters of every issue (softdesk_issuestat).
+#
+# Triggers created by migrations 0008 and 0009 update them in the transaction of every
+# write to softdesk_issue and softdesk_comment, bulk inserts, queryset updates and
+# cascading deletes included, so reading the stats of a project is one indexed query
+# on its counter rows, whatever its number of issues. The comment count of each issue
+# is the comment_count of the issue list, read from softdesk_issuestat.
+
+FIELDS = {
+    'status': Issue.STATUS_CHOICES,
+    'priority': Issue.PRIORITY_CHOICES,
+    'tag': Issue.TAG_CHOICES,
+}
+
+
+def project_stats(project_id):
+    stats = {field: {value: 0 for value, _ in choices} for field, choices in FIELDS.items()}
+    comments = 0
+    for field, value, total in ProjectStat.objects.filter(project_id=project_id).values_list('field', 'value', 'total'):
+        if field == 'comments':
+            comments = total
+        elif total:
+            stats[field][value] = total
+
+    issues = sum(stats['status'].values())
+    return {
+        'project': project_id,
+        'issues': issues,
+        **stats,
+        'comments': comments,
+        'comments_per_issue': {
+            'mean': round(comments / issues, 2) if issues else 0,
+        },
+    }
+
+
+def rebuild(project_ids=None):
+    # recount from the issue and comment tables, every project or only the given ones
+    stats = ProjectStat.objects.all()
+    issue_stats = IssueStat.objects.all()
+    issues = Issue.objects.all()
+    comments = Comment.objects.all()
+    if project_ids is not None:
+        stats = stats.filter(project_id__in=project_ids)
+        issue_stats = issue_stats.filter(project_id__in=project_ids)
+        issues = issues.filter(project_id__in=project_ids)
+        comments = comments.filter(issue__project_id__in=project_ids)
+
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            # reads stay allowed, writes wait so the triggers cannot count anything twice
+            with connection.cursor() as cursor:
+                cursor.execute('LOCK TABLE softdesk_issue, softdesk_comment IN SHARE MODE')
+        # on SQLite the deletes take the write lock before anything is counted
+        stats.delete()
+        issue_stats.delete()
+
+        ProjectStat.objects.bulk_create([
+            ProjectStat(project_id=row['project_id'], field=field, value=row[field], total=row['total'])
+            for field in FIELDS
+            for row in issues.values('project_id', field).annotate(total=Count('id')).order_by()
+        ] + [
+            ProjectStat(project_id=row['issue__project_id'], field='comments', value='', total=row['total'])
+            for row in comments.values('issue__project_id').annotate(total=Count('id')).order_by()
+        ], batch_size=1000)
+        IssueStat.objects.bulk_create([
+            IssueStat(issue_id=issue_id, project_id=project_id, comment_count=comment_count)
+            for issue_id, project_id, comment_count in
+            issues.annotate(comment_count=Count('comment')).values_list('id', 'project_id', 'comment_count').order_by()
+        ], batch_size=1000)
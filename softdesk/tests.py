@@ -1,3 +1,1181 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import tempfile
+import time
+import warnings
+from datetime import date, datetime, timezone
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.db import connection, connections
+from django.db.utils import load_backend
+from django.db.models import Count
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.cache.backends.base import CacheKeyWarning
+from django.core.management import CommandError, call_command
+from django.core.paginator import UnorderedObjectListWarning
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import http_date
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import User
+from SoftdeskAPI import database
+from SoftdeskAPI.testing import BUDGET_SCALES, QueryBudgetMixin
+from softdesk import caching, fastpath, stats, timing
+from softdesk import search as full_text
+from softdesk.memberships import forget_memberships, is_contributor
+from softdesk.replicas import check_pin_cache, pin_key
+from softdesk.models import Comment, Issue, IssueStat, Project, ProjectContributor, ProjectStat
+from softdesk.parsers import FastJSONParser
+from softdesk.renderers import FastJSONRenderer
+
+
+def make_user(username):
+    return User.objects.create(username=username, date_of_birth=date(1990, 1, 1))
+
+
+def make_project(creator, **fields):
+    # a project with its creator as contributor
+    project = Project.objects.create(creator=creator, **{'name': 'p', 'description': 'd', 'project_type': 'web', **fields})
+    ProjectContributor.objects.create(project=project, contributor=creator)
+    return project
+
+
+def make_issue(project, creator, **fields):
+    return Issue.objects.create(project=project, creator=creator, **{
+        'assigned_to': creator, 'name': 'issue', 'description': 'd', 'priority': 'low', **fields,
+    })
+
+
+class ProjectTestCase(TestCase):
+    # an owner, authenticated on self.client, and a project of theirs
+    project_fields = {}
+
+    def setUp(self):
+        cache.clear()
+        self.owner = make_user('owner')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.project = make_project(self.owner, **self.project_fields)
+
+
+class ProjectQueryCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = make_user('owner')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def make_project(self, contributors=0, issues=0):
+        project = make_project(self.owner)
+        for i in range(contributors):
+            user = make_user(f'{project.id}-contrib-{i}')
+            ProjectContributor.objects.create(project=project, contributor=user)
+        for i in range(issues):
+            make_issue(project, self.owner, name=f'issue {i}')
+        return project
+
+    def test_project_list_query_count_is_constant(self):
+        for _ in range(3):
+            self.make_project()
+        # validator + count + page
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('project-list'))
+        self.assertEqual(response.status_code, 200)
+
+        for _ in range(10):
+            self.make_project()
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('project-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_project_detail_query_count_is_constant(self):
+        small = self.make_project(contributors=1, issues=1)
+        large = self.make_project(contributors=20, issues=10)
+        # update time + membership check + project + contributors prefetch + issues count + issues page
+        for project in (small, large):
+            with self.assertNumQueries(6):
+                response = self.client.get(reverse('retrieve-update-delete-project', kwargs={'id': project.id}))
+            self.assertEqual(response.status_code, 200)
+
+        details = response.data['results']['project_details']
+        self.assertEqual(len(details['contributors']), 21)
+        self.assertEqual(details['creator'], 'owner')
+        self.assertEqual(response.data['results']['project_issues'][0]['assigned_to'], 'owner')
+
+    def test_counts_are_annotated(self):
+        project = self.make_project(contributors=2, issues=3)
+        issue = project.issue_set.first()
+        Issue.objects.filter(id=issue.id).update(status='finished')
+        Comment.objects.bulk_create([Comment(issue=issue, creator=self.owner, comment='c') for _ in range(4)])
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('project-list'))
+        self.assertEqual(response.data['results'][0]['contributor_count'], 3)
+        self.assertEqual(response.data['results'][0]['open_issue_count'], 2)
+
+        response = self.client.get(reverse('retrieve-update-delete-project', kwargs={'id': project.id}))
+        counts = {row['id']: row['comment_count'] for row in response.data['results']['project_issues']}
+        self.assertEqual(counts[issue.id], 4)
+        self.assertEqual(sum(counts.values()), 4)
+
+        response = self.client.get(reverse('retrieve-update-delete-issue', kwargs={'issue_id': issue.id}))
+        self.assertEqual(response.data['results']['issue_details']['comment_count'], 4)
+
+    def test_comments_refresh_the_cached_project_detail(self):
+        project = self.make_project(issues=1)
+        issue = project.issue_set.get()
+        url = reverse('retrieve-update-delete-project', kwargs={'id': project.id})
+        self.client.get(url)
+        self.client.post(reverse('comment-create', kwargs={'issue_id': issue.id}), {'comment': 'c'})
+        response = self.client.get(url)
+        self.assertEqual(response.data['results']['project_issues'][0]['comment_count'], 1)
+
+
+class ProjectListScopeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = make_user('owner')
+        self.other = make_user('other')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.web = Project.objects.create(creator=self.owner, name='web', description='d', project_type='web')
+        self.ios = Project.objects.create(creator=self.other, name='ios', description='d', project_type='iOS')
+        self.hidden = Project.objects.create(creator=self.other, name='hidden', description='d', project_type='web')
+        ProjectContributor.objects.bulk_create([
+            ProjectContributor(project=self.web, contributor=self.owner),
+            ProjectContributor(project=self.ios, contributor=self.owner),
+            ProjectContributor(project=self.ios, contributor=self.other),
+            ProjectContributor(project=self.hidden, contributor=self.other),
+        ])
+        Project.objects.filter(id=self.web.id).update(created_at=datetime(2024, 1, 1, tzinfo=timezone.utc))
+
+    def names(self, query=''):
+        response = self.client.get(reverse('project-list') + query)
+        self.assertEqual(response.status_code, 200)
+        return [project['name'] for project in response.data['results']]
+
+    def test_list_is_scoped_to_the_user_projects(self):
+        self.assertEqual(self.names(), ['web', 'ios'])
+
+    def test_list_filters(self):
+        self.assertEqual(self.names('?project_type=iOS'), ['ios'])
+        self.assertEqual(self.names('?creator=other'), ['ios'])
+        self.assertEqual(self.names('?created_before=2024-06-01'), ['web'])
+        self.assertEqual(self.names('?created_after=2024-06-01T00:00:00Z'), ['ios'])
+
+    def test_invalid_date_filter(self):
+        response = self.client.get(reverse('project-list') + '?created_after=yesterday')
+        self.assertEqual(response.status_code, 400)
+
+
+class CursorPaginationTests(ProjectTestCase):
+    def setUp(self):
+        super().setUp()
+        self.issue = make_issue(self.project, self.owner)
+        Comment.objects.bulk_create([
+            Comment(issue=self.issue, creator=self.owner, comment=f'comment {i}') for i in range(12)
+        ])
+
+    def walk_comments(self, url):
+        seen = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            # no pagination count, the comment_count subquery of the issue is fine
+            self.assertFalse(any('"__count"' in query['sql'] for query in queries.captured_queries))
+            seen += [comment['id'] for comment in response.data['results']['issue_comments']]
+            url = response.data['next']
+        return seen
+
+    def test_cursor_mode_walks_every_comment_in_order(self):
+        url = reverse('retrieve-update-delete-issue', kwargs={'issue_id': self.issue.id})
+        seen = self.walk_comments(url + '?pagination=cursor')
+        expected = list(Comment.objects.order_by('created_at', 'id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    @override_settings(SOFTDESK_PAGINATION_MODE='cursor')
+    def test_cursor_mode_from_settings(self):
+        url = reverse('retrieve-update-delete-issue', kwargs={'issue_id': self.issue.id})
+        self.assertEqual(len(self.walk_comments(url)), 12)
+
+    def test_page_mode_is_the_default(self):
+        response = self.client.get(reverse('retrieve-update-delete-project', kwargs={'id': self.project.id}))
+        self.assertEqual(response.data['count'], 1)
+
+    def test_page_mode_walks_every_comment_in_order(self):
+        url = reverse('retrieve-update-delete-issue', kwargs={'issue_id': self.issue.id})
+        seen = []
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', UnorderedObjectListWarning)
+            while url:
+                response = self.client.get(url)
+                seen += [comment['id'] for comment in response.data['results']['issue_comments']]
+                url = response.data['next']
+        expected = list(Comment.objects.order_by('created_at', 'id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+
+class MembershipTests(TestCase):
+    def setUp(self):
+        self.owner = make_user('owner')
+        self.other = make_user('other')
+        self.project = make_project(self.owner)
+
+    def make_request(self, user):
+        request = RequestFactory().get('/')
+        request.user = user
+        return request
+
+    def test_memberships_are_loaded_once_per_request(self):
+        request = self.make_request(self.owner)
+        with self.assertNumQueries(1):
+            self.assertTrue(is_contributor(request, self.project.id))
+            self.assertTrue(is_contributor(request, self.project.id))
+            self.assertFalse(is_contributor(request, self.project.id + 1))
+
+    @override_settings(SOFTDESK_MEMBERSHIP_CACHE_TIMEOUT=60)
+    def test_shared_cache_is_invalidated_by_add_contributor(self):
+        cache.clear()
+        self.assertFalse(is_contributor(self.make_request(self.other), self.project.id))
+        with self.assertNumQueries(0):
+            self.assertFalse(is_contributor(self.make_request(self.other), self.project.id))
+
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        response = client.post(reverse('add contributor', kwargs={'id': self.project.id}), {'username': 'other'})
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(is_contributor(self.make_request(self.other), self.project.id))
+
+        response = client.post(reverse('add contributor', kwargs={'id': self.project.id}), {'username': 'other'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ProjectContributor.objects.filter(contributor=self.other).count(), 1)
+
+        ProjectContributor.objects.filter(contributor=self.other).delete()
+        forget_memberships(self.make_request(self.owner), self.other.id)
+        self.assertFalse(is_contributor(self.make_request(self.other), self.project.id))
+
+
+class ConditionalGetTests(ProjectTestCase):
+    def setUp(self):
+        super().setUp()
+        self.issue = make_issue(self.project, self.owner)
+        self.comment = Comment.objects.create(issue=self.issue, creator=self.owner, comment='c')
+
+    def test_detail_views_answer_304_until_something_changes(self):
+        project_url = reverse('retrieve-update-delete-project', kwargs={'id': self.project.id})
+        issue_url = reverse('retrieve-update-delete-issue', kwargs={'issue_id': self.issue.id})
+        comment_url = reverse('retrieve-update-delete-comment', kwargs={'id': self.comment.id})
+        etags = {}
+        for url in (project_url, issue_url, comment_url):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('Last-Modified', response)
+            etags[url] = response['ETag']
+            # membership + validator
+            with self.assertNumQueries(2):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+            self.assertEqual(response.status_code, 304)
+
+        # a new comment changes the issue page and the comment page of the other one stays fresh
+        self.client.post(reverse('comment-create', kwargs={'issue_id': self.issue.id}), {'comment': 'new'})
+        self.assertEqual(self.client.get(issue_url, HTTP_IF_NONE_MATCH=etags[issue_url]).status_code, 200)
+        self.assertEqual(self.client.get(comment_url, HTTP_IF_NONE_MATCH=etags[comment_url]).status_code, 304)
+
+        # a new issue changes the project page
+        self.client.post(reverse('create-issue', kwargs={'project_id': self.project.id}), {
+            'name': 'new', 'description': 'd', 'priority': 'high', 'assigned_to': 'owner',
+        })
+        self.assertEqual(self.client.get(project_url, HTTP_IF_NONE_MATCH=etags[project_url]).status_code, 200)
+
+    def test_if_modified_since_is_not_honoured(self):
+        # one-second dates cannot tell two writes of the same second apart
+        url = reverse('retrieve-update-delete-comment', kwargs={'id': self.comment.id})
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(response.status_code, 200)
+
+    def test_project_list_payload_leaves_updated_at_out(self):
+        self.assertNotIn('updated_at', self.client.get(reverse('project-list')).data['results'][0])
+
+    def test_project_list_etag_tracks_deletions(self):
+        url = reverse('project-list')
+        # the newest project stays, only the row count tells the deletion apart
+        other = make_project(self.owner, name='other')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertNotEqual(self.client.get(url + '?page=2', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Project.objects.filter(id=self.project.id).delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([project['id'] for project in response.json()['results']], [other.id])
+
+
+class ResponseCacheTests(ProjectTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('retrieve-update-delete-project', kwargs={'id': self.project.id})
+
+    def test_project_detail_is_served_from_cache_until_a_write(self):
+        first = self.client.get(self.url)
+        # only the update time and the membership check are left
+        with self.assertNumQueries(2):
+            second = self.client.get(self.url)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(caching.stats(), {'hits': 1, 'misses': 1})
+
+        self.client.get(self.url + '?page_size=10')
+        self.assertEqual(caching.stats()['misses'], 2)
+
+        self.client.post(reverse('create-issue', kwargs={'project_id': self.project.id}), {
+            'name': 'new', 'description': 'd', 'priority': 'high', 'assigned_to': 'owner',
+        })
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data['results']['project_issues']), 1)
+        self.assertEqual(caching.stats()['misses'], 3)
+
+    def test_project_list_is_invalidated_by_project_update(self):
+        url = reverse('project-list')
+        self.client.get(url)
+        self.assertEqual(self.client.get(url).data['results'][0]['name'], 'p')
+        self.assertEqual(caching.stats()['hits'], 1)
+
+        self.client.patch(self.url, {'name': 'renamed'})
+        self.assertEqual(self.client.get(url).data['results'][0]['name'], 'renamed')
+
+    def test_write_between_lookup_and_store(self):
+        key, cached = caching.lookup(RequestFactory().get(self.url), caching.project_scope(self.project.id))
+        self.assertIsNone(cached)
+        self.client.patch(self.url, {'name': 'renamed'})
+        caching.store(key, {'data': {'stale': True}, 'updated_at': self.project.updated_at})
+        self.assertEqual(self.client.get(self.url).data['results']['project_details']['name'], 'renamed')
+
+    def test_write_in_another_worker(self):
+        self.client.get(self.url)
+        # the version of this worker's cache does not move, the update time does
+        Project.objects.filter(id=self.project.id).update(name='renamed', updated_at=datetime.now(timezone.utc))
+        self.assertEqual(self.client.get(self.url).data['results']['project_details']['name'], 'renamed')
+
+    @override_settings(SOFTDESK_RESPONSE_CACHE={'ALIAS': None})
+    def test_cache_can_be_disabled(self):
+        self.client.get(self.url)
+        self.client.get(self.url)
+        self.assertEqual(caching.stats(), {'hits': 0, 'misses': 0})
+
+
+class SearchTests(ProjectTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = make_user('other')
+        hidden = make_project(self.other, name='h')
+        self.issue = make_issue(self.project, self.owner, name='Login crash', description='The app crashes on login')
+        make_issue(hidden, self.other, name='Login crash', description='Someone else crashes too')
+        self.comment = Comment.objects.create(issue=self.issue, creator=self.owner, comment='Crash reproduced')
+
+    def search(self, query):
+        response = self.client.get(reverse('search'), {'q': query})
+        self.assertEqual(response.status_code, 200)
+        ranks = [result['rank'] for result in response.data['results']]
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+        return [(result['type'], result['id']) for result in response.data['results']]
+
+    def test_search_is_ranked_and_scoped(self):
+        self.assertCountEqual(self.search('crash'), [('issue', self.issue.id), ('comment', self.comment.id)])
+        self.assertEqual(self.search('login crashes'), [('issue', self.issue.id)])
+        self.assertEqual(self.search('"unbalanced'), [])
+
+    def test_index_follows_writes(self):
+        Issue.objects.bulk_create([
+            Issue(project=self.project, creator=self.owner, assigned_to=self.owner,
+                  name='Timeout', description='Bulk imported', priority='low')
+        ])
+        self.assertEqual(len(self.search('imported')), 1)
+
+        self.comment.comment = 'Cannot reproduce'
+        self.comment.save()
+        self.assertEqual(self.search('reproduced'), [])
+        self.assertEqual(self.search('reproduce'), [('comment', self.comment.id)])
+
+        self.issue.delete()
+        self.assertEqual(self.search('crash'), [])
+
+    def test_search_pagination(self):
+        Comment.objects.bulk_create([
+            Comment(issue=self.issue, creator=self.owner, comment=f'crash {i}') for i in range(6)
+        ])
+        first = self.client.get(reverse('search'), {'q': 'crash', 'page_size': 5}).data
+        second = self.client.get(first['next']).data
+        self.assertEqual(len(first['results']) + len(second['results']), 8)
+        self.assertIsNone(second['next'])
+        self.assertIsNotNone(second['previous'])
+
+    def test_unsupported_database(self):
+        with mock.patch.dict(full_text.BACKENDS, clear=True):
+            response = self.client.get(reverse('search'), {'q': 'crash'})
+        self.assertEqual(response.status_code, 501)
+
+
+class ProjectStatsTests(ProjectTestCase):
+    def setUp(self):
+        super().setUp()
+        self.issue = make_issue(self.project, self.owner, tag='bug', status='to-do')
+
+    def get_stats(self):
+        response = self.client.get(reverse('project-stats', kwargs={'id': self.project.id}))
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def assertCountersAreExact(self):
+        counted = stats.project_stats(self.project.id)
+        stats.rebuild()
+        self.assertEqual(counted, stats.project_stats(self.project.id))
+
+    def test_counters_follow_every_write_path(self):
+        issue_url = reverse('retrieve-update-delete-issue', kwargs={'issue_id': self.issue.id})
+        self.client.patch(issue_url, {'status': 'in progress', 'priority': 'high'})
+        self.client.post(reverse('comment-create', kwargs={'issue_id': self.issue.id}), {'comment': 'c'})
+        response = self.client.post(reverse('bulk-issues', kwargs={'project_id': self.project.id}), {'issues': [
+            {'name': f'b{i}', 'description': 'd', 'priority': 'medium', 'assigned_to': 'owner'} for i in range(3)
+        ]}, format='json')
+        ids = [issue['id'] for issue in response.data]
+        self.client.patch(reverse('bulk-issues', kwargs={'project_id': self.project.id}),
+                          {'ids': ids[:2], 'status': 'finished'}, format='json')
+        Comment.objects.bulk_create([Comment(issue_id=ids[0], creator=self.owner, comment='c') for _ in range(2)])
+        self.assertCountersAreExact()
+
+        data = self.get_stats()
+        self.assertEqual(data['issues'], 4)
+        self.assertEqual(data['status'], {'to-do': 0, 'in progress': 1, 'finished': 2, 'To Do': 1})
+        self.assertEqual(data['priority'], {'low': 0, 'medium': 3, 'high': 1})
+        self.assertEqual(data['comments'], 3)
+        self.assertEqual(data['comments_per_issue'], {'mean': 0.75})
+        response = self.client.get(reverse('retrieve-update-delete-project', kwargs={'id': self.project.id}))
+        counts = {issue['id']: issue['comment_count'] for issue in response.data['results']['project_issues']}
+        self.assertEqual(counts, {self.issue.id: 1, ids[0]: 2, ids[1]: 0, ids[2]: 0})
+
+        # a comment moved to an issue of another project is counted there
+        other = Project.objects.create(creator=self.owner, name='o', description='d', project_type='web')
+        Issue.objects.filter(id=ids[0]).update(project=other)
+        self.assertCountersAreExact()
+        self.assertEqual(stats.project_stats(other.id)['comments'], 2)
+        Issue.objects.filter(id=ids[0]).update(project=self.project)
+
+        # cascades: the issue takes its comments along, the project everything
+        self.client.delete(issue_url)
+        self.assertCountersAreExact()
+        self.assertEqual(self.get_stats()['comments'], 2)
+        self.project.delete()
+        self.assertFalse(ProjectStat.objects.exists())
+        self.assertFalse(IssueStat.objects.exists())
+
+    def test_stats_cost_the_same_whatever_the_number_of_issues(self):
+        Issue.objects.bulk_create([
+            Issue(project=self.project, creator=self.owner, assigned_to=self.owner, name='i', description='d',
+                  priority='high') for _ in range(200)
+        ])
+        # project, memberships and the counter rows
+        with self.assertNumQueries(3):
+            data = self.get_stats()
+        self.assertEqual(data['issues'], 201)
+
+    def test_rebuild_command(self):
+        ProjectStat.objects.update(total=42)
+        IssueStat.objects.all().delete()
+        call_command('rebuild_project_stats', self.project.id, stdout=open('/dev/null', 'w'))
+        self.assertEqual(self.get_stats()['issues'], 1)
+        self.assertEqual(self.get_stats()['comments_per_issue'], {'mean': 0})
+
+    def test_stats_are_for_contributors_only(self):
+        self.client.force_authenticate(make_user('outsider'))
+        response = self.client.get(reverse('project-stats', kwargs={'id': self.project.id}))
+        self.assertEqual(response.status_code, 403)
+
+
+class SparseFieldsTests(ProjectTestCase):
+    def setUp(self):
+        super().setUp()
+        self.issue = make_issue(self.project, self.owner, name='i', description='long text')
+        self.comment = Comment.objects.create(issue=self.issue, creator=self.owner, comment='long text')
+
+    def get(self, name, kwargs, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(name, kwargs=kwargs), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data, ' '.join(query['sql'] for query in queries.captured_queries)
+
+    def test_fields_apply_per_resource_and_defer_columns(self):
+        data, sql = self.get('retrieve-update-delete-project', {'id': self.project.id},
+                             {'fields': 'id,name', 'fields[issue]': 'id,status'})
+        self.assertEqual(set(data['results']['project_details']), {'id', 'name'})
+        self.assertEqual(set(data['results']['project_issues'][0]), {'id', 'status'})
+        self.assertNotIn('"softdesk_project"."description"', sql)
+        self.assertNotIn('"softdesk_issue"."description"', sql)
+        # contributors were not asked for, so they are not prefetched either
+        self.assertNotIn('softdesk_projectcontributor"."id"', sql)
+
+        data, sql = self.get('retrieve-update-delete-issue', {'issue_id': self.issue.id},
+                             {'fields': 'id,name,status', 'fields[comment]': 'id,creator'})
+        self.assertEqual(set(data['results']['issue_details']), {'id', 'name', 'status'})
+        self.assertEqual(data['results']['issue_comments'], [{'id': self.comment.id, 'creator': 'owner'}])
+        self.assertNotIn('"softdesk_comment"."comment"', sql)
+
+        data, sql = self.get('retrieve-update-delete-comment', {'id': self.comment.id}, {'fields': 'id'})
+        self.assertEqual(data, {'id': self.comment.id})
+
+        data, sql = self.get('project-list', {}, {'fields': 'id,open_issue_count'})
+        self.assertEqual(data['results'], [{'id': self.project.id, 'open_issue_count': 1}])
+
+    def test_expand_users(self):
+        data, _ = self.get('retrieve-update-delete-issue', {'issue_id': self.issue.id}, {'expand': 'assigned_to'})
+        issue = data['results']['issue_details']
+        self.assertEqual(issue['assigned_to']['username'], 'owner')
+        self.assertEqual(issue['creator'], 'owner')
+
+        data, _ = self.get('retrieve-update-delete-project', {'id': self.project.id},
+                           {'expand': 'contributors,creator', 'fields': 'contributors,creator'})
+        details = data['results']['project_details']
+        self.assertEqual(details['contributors'], [{'id': self.owner.id, 'username': 'owner', 'first_name': '',
+                                                    'last_name': ''}])
+        self.assertEqual(details['creator']['id'], self.owner.id)
+
+    def test_async_views_support_the_same_parameters(self):
+        url = reverse('async-issue-detail', kwargs={'issue_id': self.issue.id}) + '?fields=id&expand=creator'
+        token = AccessToken.for_user(self.owner)
+        response = async_to_sync(self.async_client.get)(url, headers={'Authorization': f'Bearer {token}'})
+        expected = self.client.get(reverse('retrieve-update-delete-issue', kwargs={'issue_id': self.issue.id}),
+                                   {'fields': 'id', 'expand': 'creator'})
+        self.assertEqual(response.json(), json.loads(expected.content))
+
+    def test_async_project_detail_drops_the_contributors_prefetch(self):
+        url = reverse('async-project-detail', kwargs={'id': self.project.id}) + '?fields=id,name'
+        token = AccessToken.for_user(self.owner)
+        with CaptureQueriesContext(connection) as queries:
+            response = async_to_sync(self.async_client.get)(url, headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.json()['results']['project_details'], {'id': self.project.id, 'name': 'p'})
+        self.assertNotIn('softdesk_projectcontributor"."id"', ' '.join(query['sql'] for query in queries))
+
+
+class FastJSONTests(TestCase):
+    def test_renderer_output_matches_drf(self):
+        owner = make_user('owner')
+        project = make_project(owner, name='p\u2028é')
+        make_issue(project, owner, name='i')
+        client = APIClient()
+        client.force_authenticate(owner)
+        payloads = [
+            client.get(reverse('retrieve-update-delete-project', kwargs={'id': project.id})).data,
+            client.get(reverse('project-stats', kwargs={'id': project.id})).data,
+            {'at': datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc), 'ratio': 0.1},
+        ]
+        for data in payloads:
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(payloads[0], 'application/json; indent=2'),
+                         JSONRenderer().render(payloads[0], 'application/json; indent=2'))
+
+    def test_parser(self):
+        body = '{"name": "é", "ids": [1, 2]}'.encode()
+        self.assertEqual(FastJSONParser().parse(BytesIO(body)), {'name': 'é', 'ids': [1, 2]})
+        for invalid in (b'{"a": NaN}', b'{'):
+            with self.assertRaises(ParseError):
+                FastJSONParser().parse(BytesIO(invalid))
+
+
+class FastPathParityTests(ProjectTestCase):
+    # characters the fast path has to escape like the JSON renderer
+    project_fields = {'name': 'p "1" \u2028', 'description': 'd\n'}
+
+    def setUp(self):
+        super().setUp()
+        other = make_user('Zoë')
+        ProjectContributor.objects.create(project=self.project, contributor=other)
+        self.issue = make_issue(self.project, other, assigned_to=self.owner, name='é', description='',
+                                priority='high', status='finished')
+        make_issue(self.project, self.owner, assigned_to=other, name='i')
+        Comment.objects.bulk_create([
+            Comment(issue=self.issue, creator=[self.owner, other][i % 2], comment=f'c{i}') for i in range(7)
+        ])
+
+    def assertSameBytes(self, url, params=None):
+        with mock.patch.object(fastpath.CompiledSerializer, 'render', autospec=True,
+                               side_effect=fastpath.CompiledSerializer.render) as render:
+            fast = self.client.get(url, params)
+        self.assertTrue(render.called)
+        cache.clear()
+        with override_settings(SOFTDESK_SERIALIZER_FAST_PATH=False):
+            slow = self.client.get(url, params)
+        cache.clear()
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(fast.content, slow.content)
+
+    def test_list_pages_match_the_serializers(self):
+        self.assertSameBytes(reverse('project-list'))
+        project_url = reverse('retrieve-update-delete-project', kwargs={'id': self.project.id})
+        self.assertSameBytes(project_url, {'page_size': 50})
+        self.assertSameBytes(project_url, {'pagination': 'cursor'})
+        issue_url = reverse('retrieve-update-delete-issue', kwargs={'issue_id': self.issue.id})
+        self.assertSameBytes(issue_url)
+        self.assertSameBytes(issue_url, {'page': 2})
+        self.assertSameBytes(issue_url, {'pagination': 'cursor', 'page_size': 3})
+
+    def test_fields_and_expand_use_the_serializers(self):
+        request = RequestFactory().get('/', {'fields[issue]': 'id'})
+        request.query_params = request.GET
+        self.assertFalse(fastpath.applies(request))
+        request.query_params = RequestFactory().get('/', {'expand': 'creator'}).GET
+        self.assertFalse(fastpath.applies(request))
+
+
+@override_settings(SOFTDESK_TIMING={'ENABLED': True, 'ALIAS': 'default', 'FLUSH': 60})
+class TimingMiddlewareTests(ProjectTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('retrieve-update-delete-project', kwargs={'id': self.project.id})
+
+    def test_server_timing_header_and_log_line(self):
+        with self.assertLogs('softdesk.timing', 'INFO') as logs, CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        metrics = {part.split(';')[0] for part in response['Server-Timing'].split(', ')}
+        self.assertEqual(metrics, {'db', 'serializer', 'view', 'total'})
+        self.assertIn(f'desc="{len(queries)} queries"', response['Server-Timing'])
+
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line['route'], 'GET /api/project/<int:id>/')
+        self.assertEqual(line['queries'], len(queries))
+        self.assertGreater(line['serializer_ms'], 0)
+        self.assertLessEqual(line['view_ms'], line['total_ms'])
+
+    def test_percentiles_per_route(self):
+        with self.assertLogs('softdesk.timing', 'INFO'):
+            for _ in range(5):
+                self.client.get(self.url)
+            self.client.get(reverse('project-list'))
+        # the report flushes this process's histograms first
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)
+            summary = timing.report()
+        self.assertEqual(summary['GET /api/project/<int:id>/']['count'], 5)
+        self.assertEqual(set(summary['GET /api/project/']['total']), {'p50', 'p95', 'p99'})
+        self.assertEqual(summary['GET /api/project/']['queries']['p50'], 3)
+
+        output = StringIO()
+        call_command('timing_report', '--reset', stdout=output)
+        self.assertIn('GET /api/project/<int:id>/  (5 requests)', output.getvalue())
+        self.assertEqual(timing.report(), {})
+
+    def test_report_endpoint_is_for_staff(self):
+        with self.assertLogs('softdesk.timing', 'INFO'):
+            self.assertEqual(self.client.get(reverse('timing-report')).status_code, 403)
+            self.owner.is_staff = True
+            self.owner.save()
+            response = self.client.get(reverse('timing-report'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('GET /api/timing/', response.data)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual([timing.percentile(values, rank) for rank in (50, 95, 99)], [50, 95, 99])
+        self.assertEqual(timing.percentile([7], 99), 7)
+
+        histogram = {bucket: 1 for bucket in values}
+        self.assertEqual([timing.histogram_percentile(histogram, rank) for rank in (50, 95, 99)], [50, 95, 99])
+        self.assertEqual(timing.histogram_percentile({7: 3}, 99), 7)
+        self.assertEqual(timing.histogram_percentile({}, 99), 0)
+
+    def test_buckets(self):
+        for milliseconds in (0.5, 12.3, 480.0):
+            bucket = timing.bucket_of('total', milliseconds)
+            # rounded up by less than one bucket
+            self.assertLessEqual(milliseconds, timing.bucket_value('total', bucket))
+            self.assertLessEqual(timing.bucket_value('total', bucket), round(milliseconds * timing.GROWTH, 2))
+        self.assertEqual(timing.bucket_of('total', 0), 0)
+        self.assertEqual(timing.bucket_of('queries', 7), 7)
+
+
+class BenchmarkSuiteTests(TransactionTestCase):
+    # TransactionTestCase: the benchmark's worker threads must see the generated rows
+
+    def generate(self, **sizes):
+        sizes = {'users': 30, 'projects': 10, 'contributors': 60, 'issues': 200, 'comments': 400, **sizes}
+        call_command('generate_data', *[f'--{name}={value}' for name, value in sizes.items()], stdout=StringIO())
+
+    def test_generated_data_is_skewed_and_consistent(self):
+        self.generate()
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Issue.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 400)
+
+        # a few big projects, many small ones
+        sizes = sorted(Project.objects.annotate(issues=Count('issue')).values_list('issues', flat=True))
+        self.assertGreater(sizes[-1], 4 * sizes[len(sizes) // 2])
+
+        # creators, assignees and commenters are all contributors of their project
+        members = set(ProjectContributor.objects.values_list('project_id', 'contributor_id'))
+        self.assertLessEqual(set(Project.objects.values_list('id', 'creator_id')), members)
+        self.assertLessEqual(set(Issue.objects.values_list('project_id', 'assigned_to_id')), members)
+        self.assertLessEqual(set(Comment.objects.values_list('issue__project_id', 'creator_id')), members)
+        # the stats triggers kept up with the bulk inserts
+        self.assertEqual(sum(IssueStat.objects.values_list('comment_count', flat=True)), 400)
+
+        with self.assertRaisesMessage(CommandError, 'already exist'):
+            self.generate()
+
+    def test_benchmark_saves_and_compares_runs(self):
+        self.generate()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'run.json')
+            options = ['--requests=6', '--concurrency=2', '--routes', 'project-list', 'issue-detail']
+            call_command('benchmark', *options, f'--output={path}', stdout=StringIO())
+            with open(path) as output:
+                run = json.load(output)
+            output = StringIO()
+            call_command('benchmark', *options, f'--compare={path}', stdout=output)
+
+        self.assertEqual(run['rows']['Issue'], 200)
+        self.assertEqual(set(run['routes']), {'project-list', 'issue-detail'})
+        for result in run['routes'].values():
+            self.assertEqual((result['requests'], result['errors']), (6, 0))
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        self.assertIn('req/s, p95 was', output.getvalue())
+
+    @override_settings(SOFTDESK_PASSWORD_HASHING={'WORKERS': 2, 'MAX_PENDING': 16, 'ITERATIONS': 1000})
+    def test_login_benchmark(self):
+        self.generate()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'login.json')
+            # logins write their outstanding token, one writer at a time in the in-memory database
+            call_command('benchmark_login', '--requests=4', '--concurrency=1', '--read-concurrency=1',
+                         '--workers', '0', '2', f'--output={path}', stdout=StringIO())
+            with open(path) as output:
+                runs = json.load(output)['runs']
+        self.assertEqual(set(runs), {'inline', 'workers=2'})
+        for run in runs.values():
+            self.assertEqual((run['login']['requests'], run['login']['errors']), (4, 0))
+            self.assertEqual(run['project-list']['requests'], 4)
+
+    def test_benchmark_writes_only_on_request(self):
+        self.generate()
+        # the in-memory test database takes one writer at a time
+        call_command('benchmark', '--requests=3', '--concurrency=1', stdout=StringIO())
+        self.assertEqual(Comment.objects.count(), 400)
+        call_command('benchmark', '--requests=3', '--concurrency=1', '--routes', 'comment-create', stdout=StringIO())
+        self.assertEqual(Comment.objects.count(), 403)
+
+
+class DatabaseConfigTests(TestCase):
+    def test_environment(self):
+        default = database.from_environ({}, '/srv')
+        self.assertEqual(default['ENGINE'], 'SoftdeskAPI.backends.sqlite3')
+        self.assertEqual(str(default['NAME']), '/srv/db.sqlite3')
+        self.assertEqual(default['OPTIONS'], {
+            'timeout': 5.0, 'pragmas': {'journal_mode': 'WAL', 'synchronous': 'NORMAL'},
+        })
+        self.assertEqual((default['CONN_MAX_AGE'], default['CONN_HEALTH_CHECKS']), (0, True))
+
+        postgresql = database.from_environ({'SOFTDESK_DB_ENGINE': 'postgresql', 'SOFTDESK_DB_HOST': 'db'}, '/srv')
+        self.assertEqual((postgresql['NAME'], postgresql['HOST'], postgresql['CONN_MAX_AGE']), ('softdesk', 'db', 60))
+
+        pooled = database.from_environ({
+            'SOFTDESK_DB_ENGINE': 'postgresql-pool', 'SOFTDESK_DB_POOL_MAX_SIZE': '20',
+        }, '/srv')
+        self.assertEqual(pooled['ENGINE'], 'SoftdeskAPI.backends.postgresql_pool')
+        self.assertEqual(pooled['OPTIONS']['pool'], {'min_size': 2, 'max_size': 20, 'timeout': 10})
+        self.assertEqual(pooled['CONN_MAX_AGE'], 0)
+
+        with self.assertRaises(ValueError):
+            database.from_environ({'SOFTDESK_DB_ENGINE': 'mysql'}, '/srv')
+
+    def test_replicas(self):
+        primary = database.from_environ({}, '/srv')
+        self.assertEqual(database.replicas_from_environ({}, primary), {})
+        replicas = database.replicas_from_environ({'SOFTDESK_DB_REPLICAS': '/srv/r1.sqlite3, /srv/r2.sqlite3'}, primary)
+        self.assertEqual(list(replicas), ['replica1', 'replica2'])
+        self.assertEqual(replicas['replica2']['NAME'], '/srv/r2.sqlite3')
+        self.assertEqual(replicas['replica2']['OPTIONS'], primary['OPTIONS'])
+        self.assertEqual(replicas['replica1']['TEST'], {'MIRROR': 'default'})
+
+        primary = database.from_environ({'SOFTDESK_DB_ENGINE': 'postgresql', 'SOFTDESK_DB_PORT': '5432'}, '/srv')
+        replicas = database.replicas_from_environ({'SOFTDESK_DB_REPLICAS': 'db-r1,db-r2:5433'}, primary)
+        self.assertEqual([(replica['HOST'], replica['PORT']) for replica in replicas.values()],
+                         [('db-r1', '5432'), ('db-r2', '5433')])
+
+    def test_sqlite_pragmas(self):
+        with connection.cursor() as cursor:
+            self.assertEqual(cursor.execute('PRAGMA synchronous').fetchone(), (1,))
+            self.assertEqual(cursor.execute('PRAGMA busy_timeout').fetchone(), (5000,))
+
+        # the test database is in memory, WAL needs a file
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = load_backend(connection.settings_dict['ENGINE']).DatabaseWrapper(
+                {**connection.settings_dict, 'NAME': os.path.join(directory, 'wal.sqlite3')}, alias='wal'
+            )
+            try:
+                with wrapper.cursor() as cursor:
+                    self.assertEqual(cursor.execute('PRAGMA journal_mode').fetchone(), ('wal',))
+            finally:
+                wrapper.close()
+
+
+@override_settings(SOFTDESK_READ_REPLICAS={'ALIASES': ['replica'], 'PIN_SECONDS': 5})
+class ReplicaRoutingTests(ProjectTestCase):
+    # a second SQLite file stands in for the replica, with rows the primary does not have
+    project_fields = {'name': 'primary'}
+
+    @classmethod
+    def setUpClass(cls):
+        # added here rather than in DATABASES, so that the test runner does not create it
+        cls.directory = tempfile.TemporaryDirectory()
+        connections.settings['replica'] = {
+            **connections.settings['default'], 'NAME': os.path.join(cls.directory.name, 'replica.sqlite3'),
+        }
+        call_command('migrate', database='replica', verbosity=0)
+        cls.databases = {'default', 'replica'}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        cls.directory.cleanup()
+
+    def setUp(self):
+        super().setUp()
+        contributor = ProjectContributor.objects.get(project=self.project)
+        self.issue = make_issue(self.project, self.owner, name='primary')
+        self.comment = Comment.objects.create(issue=self.issue, creator=self.owner, comment='primary')
+        for row in [self.owner, self.project, contributor, self.issue, self.comment]:
+            type(row).objects.using('replica').bulk_create([row])
+        Project.objects.using('replica').update(name='replica', updated_at=datetime(2020, 1, 1, tzinfo=timezone.utc))
+        Issue.objects.using('replica').update(name='replica')
+        Comment.objects.using('replica').update(comment='replica')
+
+    def project_name(self):
+        response = self.client.get(reverse('retrieve-update-delete-project', kwargs={'id': self.project.id}))
+        return response.json()['results']['project_details']['name']
+
+    def test_read_endpoints_use_the_replica(self):
+        response = self.client.get(reverse('project-list'))
+        self.assertEqual([project['name'] for project in response.json()['results']], ['replica'])
+        self.assertEqual(self.project_name(), 'replica')
+        response = self.client.get(reverse('retrieve-update-delete-issue', kwargs={'issue_id': self.issue.id}))
+        self.assertEqual(response.json()['results']['issue_details']['name'], 'replica')
+        response = self.client.get(reverse('retrieve-update-delete-comment', kwargs={'id': self.comment.id}))
+        self.assertEqual(response.json()['comment'], 'replica')
+
+    def test_other_endpoints_and_writes_use_the_primary(self):
+        response = self.client.get(reverse('search'), {'q': 'primary'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'primary')
+
+        url = reverse('retrieve-update-delete-comment', kwargs={'id': self.comment.id})
+        self.assertEqual(self.client.patch(url, {'comment': 'edited'}).status_code, 200)
+        self.assertEqual(Comment.objects.get().comment, 'edited')
+        self.assertEqual(Comment.objects.using('replica').get().comment, 'replica')
+
+    def test_writes_pin_the_user_to_the_primary(self):
+        url = reverse('retrieve-update-delete-comment', kwargs={'id': self.comment.id})
+        self.assertEqual(self.client.patch(url, {'comment': 'edited'}).status_code, 200)
+        self.assertTrue(cache.get(pin_key(self.owner.id)))
+        self.assertEqual(self.client.get(url).json()['comment'], 'edited')
+
+        # once the pin expires the replica answers again
+        cache.delete(pin_key(self.owner.id))
+        self.assertEqual(self.client.get(url).json()['comment'], 'replica')
+
+    def test_replica_pages_are_cached_apart(self):
+        # under the replica's update time, which the primary's readers do not ask for
+        self.assertEqual(self.project_name(), 'replica')
+        cache.set(pin_key(self.owner.id), True)
+        self.assertEqual(self.project_name(), 'primary')
+
+    def test_pins_need_a_shared_cache(self):
+        self.assertEqual([error.id for error in check_pin_cache()], ['softdesk.E001'])
+        with override_settings(SOFTDESK_READ_REPLICAS={'ALIASES': []}):
+            self.assertEqual(check_pin_cache(), [])
+        shared = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': self.directory.name}
+        with override_settings(CACHES={**settings.CACHES, 'pins': shared},
+                               SOFTDESK_READ_REPLICAS={'ALIASES': ['replica'], 'CACHE': 'pins'}):
+            self.assertEqual(check_pin_cache(), [])
+
+    @override_settings(SOFTDESK_READ_REPLICAS={'ALIASES': [], 'PIN_SECONDS': 5})
+    def test_no_replicas(self):
+        self.assertEqual(self.project_name(), 'primary')
+
+
+class AsyncReadPathTests(ProjectTestCase):
+    def setUp(self):
+        super().setUp()
+        self.outsider = make_user('outsider')
+        self.issue = make_issue(self.project, self.owner)
+        self.comment = Comment.objects.create(issue=self.issue, creator=self.owner, comment='c')
+
+    def async_get(self, url, user=None):
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'} if user else {}
+        return async_to_sync(self.async_client.get)(url, headers=headers)
+
+    def test_async_views_match_the_sync_ones(self):
+        pairs = [
+            ('project-list', 'async-project-list', {}),
+            ('retrieve-update-delete-project', 'async-project-detail', {'id': self.project.id}),
+            ('retrieve-update-delete-issue', 'async-issue-detail', {'issue_id': self.issue.id}),
+            ('retrieve-update-delete-comment', 'async-comment-detail', {'id': self.comment.id}),
+        ]
+        for sync_name, async_name, kwargs in pairs:
+            expected = self.client.get(reverse(sync_name, kwargs=kwargs))
+            response = self.async_get(reverse(async_name, kwargs=kwargs), self.owner)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), json.loads(expected.content))
+
+    def test_async_views_check_authentication_and_membership(self):
+        url = reverse('async-project-detail', kwargs={'id': self.project.id})
+        self.assertEqual(self.async_get(url).status_code, 401)
+        self.assertEqual(self.async_get(url, self.outsider).status_code, 403)
+        response = self.async_get(reverse('async-comment-detail', kwargs={'id': self.comment.id}), self.outsider)
+        self.assertEqual(response.status_code, 403)
+
+    def test_refused_requests_skip_the_page(self):
+        url = reverse('async-issue-detail', kwargs={'issue_id': self.issue.id})
+        # user (the token has no claims) + issue + membership set, neither the comments page nor its count
+        with self.assertNumQueries(3):
+            self.assertEqual(self.async_get(url, self.outsider).status_code, 403)
+
+
+class SoftdeskQueryBudgetMixin(QueryBudgetMixin):
+    query_budgets = {
+        'project-list:get': 3,
+        'project-list:post': 2,
+        # includes the SAVEPOINT/RELEASE pair around the insert
+        'add contributor': 7,
+        'remove contributor': 6,
+        'add contributors': 5,
+        'remove contributors': 4,
+        'retrieve-update-delete-project:get': 6,
+        'export-project': 4,
+        'project-stats': 3,
+        'retrieve-update-delete-project:patch': 4,
+        # the cascade collector batches its deletes, so this one grows with the seeded rows
+        'retrieve-update-delete-project:delete': 19,
+        'create-issue': 7,
+        # project, membership, assignees, and the insert inside its SAVEPOINT/RELEASE pair
+        'bulk-issues:post': 7,
+        'bulk-issues:patch': 4,
+        'retrieve-update-delete-issue:get': 6,
+        'retrieve-update-delete-issue:patch': 9,
+        'retrieve-update-delete-issue:delete': 6,
+        # comments also touch their project, whose detail page shows comment counts
+        'comment-create': 5,
+        'retrieve-update-delete-comment:get': 3,
+        'retrieve-update-delete-comment:patch': 4,
+        'retrieve-update-delete-comment:delete': 5,
+        'search': 1,
+        'timing-report': 0,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('owner')
+        cls.outsider = make_user('outsider')
+        users = User.objects.bulk_create([
+            User(username=f'user-{i}', date_of_birth=date(1990, 1, 1)) for i in range(cls.rows)
+        ])
+        Project.objects.bulk_create([
+            Project(creator=cls.owner, name=f'project {i}', description='d', project_type='web')
+            for i in range(cls.rows)
+        ])
+        cls.project = Project.objects.create(creator=cls.owner, name='main', description='d', project_type='web')
+        ProjectContributor.objects.bulk_create(
+            [ProjectContributor(project=cls.project, contributor=cls.owner)]
+            + [ProjectContributor(project=cls.project, contributor=user) for user in users]
+        )
+        Issue.objects.bulk_create([
+            Issue(project=cls.project, creator=cls.owner, assigned_to=users[i % len(users)],
+                  name=f'issue {i}', description='d', priority='low')
+            for i in range(cls.rows)
+        ])
+        cls.issue = Issue.objects.filter(project=cls.project).first()
+        Comment.objects.bulk_create([
+            Comment(issue=cls.issue, creator=users[i % len(users)], comment=f'comment {i}')
+            for i in range(cls.rows)
+        ])
+        cls.comment = Comment.objects.create(issue=cls.issue, creator=cls.owner, comment='mine')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_project_list(self):
+        url = reverse('project-list')
+        response = self.request_within_budget('project-list:get', 'get', url)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.request_within_budget('project-list:post', 'post', url, {
+            'name': 'new', 'description': 'd', 'project_type': 'web',
+        })
+        self.assertEqual(response.status_code, 201)
+
+    def test_contributors(self):
+        response = self.request_within_budget('add contributor', 'post', reverse(
+            'add contributor', kwargs={'id': self.project.id}), {'username': 'outsider'})
+        self.assertEqual(response.status_code, 201)
+
+        response = self.request_within_budget('remove contributor', 'delete', reverse(
+            'remove contributor', kwargs={'id': self.project.id}), {'username': 'outsider'})
+        self.assertEqual(response.status_code, 204)
+
+    def test_bulk_contributors(self):
+        usernames = ['outsider', 'user-0', 'ghost']
+        response = self.request_within_budget('add contributors', 'post', reverse(
+            'add contributors', kwargs={'id': self.project.id}), {'usernames': usernames})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], {
+            'outsider': 'added', 'user-0': 'already a contributor', 'ghost': 'user not found',
+        })
+
+        response = self.request_within_budget('remove contributors', 'delete', reverse(
+            'remove contributors', kwargs={'id': self.project.id}), {'usernames': usernames + ['owner']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], {
+            'outsider': 'removed', 'user-0': 'removed', 'ghost': 'not a contributor',
+            'owner': 'project creator cannot be removed',
+        })
+        self.assertFalse(ProjectContributor.objects.filter(
+            project=self.project, contributor__username__in=['outsider', 'user-0']).exists())
+
+    def test_project_detail(self):
+        url = reverse('retrieve-update-delete-project', kwargs={'id': self.project.id})
+        response = self.request_within_budget('retrieve-update-delete-project:get', 'get', url)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.request_within_budget('retrieve-update-delete-project:patch', 'patch', url, {'name': 'renamed'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_export_project(self):
+        url = reverse('export-project', kwargs={'id': self.project.id})
+        response = self.request_within_budget('export-project', 'get', url)
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(line) for line in response.streamed_content.decode().splitlines()]
+        self.assertEqual(len(lines), self.rows)
+        self.assertEqual(len(lines[0]['comments']), self.rows + 1)
+        self.assertEqual(lines[0]['comments'][-1]['comment'], 'mine')
+
+        response = self.request_within_budget('export-project', 'get', url + '?output=csv')
+        rows = list(csv.DictReader(response.streamed_content.decode().splitlines()))
+        # every comment of the first issue, then one row per remaining issue
+        self.assertEqual(len(rows), (self.rows + 1) + (self.rows - 1))
+        self.assertEqual(rows[0]['issue_id'], str(self.issue.id))
+
+    def test_project_stats(self):
+        url = reverse('project-stats', kwargs={'id': self.project.id})
+        response = self.request_within_budget('project-stats', 'get', url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['issues'], self.rows)
+        self.assertEqual(response.data['comments'], self.rows + 1)
+
+    def test_project_delete(self):
+        url = reverse('retrieve-update-delete-project', kwargs={'id': self.project.id})
+        response = self.request_within_budget('retrieve-update-delete-project:delete', 'delete', url)
+        self.assertEqual(response.status_code, 204)
+
+    def test_create_issue(self):
+        response = self.request_within_budget('create-issue', 'post', reverse(
+            'create-issue', kwargs={'project_id': self.project.id}), {
+            'name': 'new', 'description': 'd', 'priority': 'high', 'assigned_to': 'user-0',
+        })
+        self.assertEqual(response.status_code, 201)
+
+    def test_bulk_issues(self):
+        url = reverse('bulk-issues', kwargs={'project_id': self.project.id})
+        issues = [
+            {'name': f'imported {i}', 'description': 'd', 'priority': 'low', 'assigned_to': f'user-{i % 3}'}
+            for i in range(20)
+        ]
+        response = self.request_within_budget('bulk-issues:post', 'post', url, {'issues': issues})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 20)
+        self.assertEqual(response.data[4]['assigned_to'], 'user-1')
+
+        ids = [issue['id'] for issue in response.data]
+        response = self.request_within_budget('bulk-issues:patch', 'patch', url, {
+            'ids': ids, 'status': 'finished', 'priority': 'high',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 20)
+        self.assertEqual(Issue.objects.filter(id__in=ids, status='finished', priority='high').count(), 20)
+
+    def test_bulk_issues_rejects_outside_assignees(self):
+        url = reverse('bulk-issues', kwargs={'project_id': self.project.id})
+        response = self.client.post(url, {'issues': [
+            {'name': 'a', 'description': 'd', 'priority': 'low', 'assigned_to': 'user-0'},
+            {'name': 'b', 'description': 'd', 'priority': 'low', 'assigned_to': 'outsider'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.data['errors']), [1])
+        self.assertFalse(Issue.objects.filter(name='a').exists())
+
+    def test_issue_detail(self):
+        url = reverse('retrieve-update-delete-issue', kwargs={'issue_id': self.issue.id})
+        response = self.request_within_budget('retrieve-update-delete-issue:get', 'get', url)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.request_within_budget('retrieve-update-delete-issue:patch', 'patch', url, {
+            'status': 'finished', 'assigned_to': 'user-0',
+        })
+        self.assertEqual(response.status_code, 200)
+
+    def test_issue_delete(self):
+        url = reverse('retrieve-update-delete-issue', kwargs={'issue_id': self.issue.id})
+        response = self.request_within_budget('retrieve-update-delete-issue:delete', 'delete', url)
+        self.assertEqual(response.status_code, 204)
+
+    def test_create_comment(self):
+        response = self.request_within_budget('comment-create', 'post', reverse(
+            'comment-create', kwargs={'issue_id': self.issue.id}), {'comment': 'new'})
+        self.assertEqual(response.status_code, 201)
+
+    def test_comment_detail(self):
+        url = reverse('retrieve-update-delete-comment', kwargs={'id': self.comment.id})
+        response = self.request_within_budget('retrieve-update-delete-comment:get', 'get', url)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.request_within_budget('retrieve-update-delete-comment:patch', 'patch', url, {'comment': 'edited'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_search(self):
+        response = self.request_within_budget('search', 'get', reverse('search') + '?q=comment')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_timing_report(self):
+        self.owner.is_staff = True
+        response = self.request_within_budget('timing-report', 'get', reverse('timing-report'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_comment_delete(self):
+        url = reverse('retrieve-update-delete-comment', kwargs={'id': self.comment.id})
+        response = self.request_within_budget('retrieve-update-delete-comment:delete', 'delete', url)
+        self.assertEqual(response.status_code, 204)
+
+
+class SoftdeskQueryBudget10Tests(SoftdeskQueryBudgetMixin, TestCase):
+    rows = BUDGET_SCALES[0]
+
+
+class SoftdeskQueryBudget100Tests(SoftdeskQueryBudgetMixin, TestCase):
+    rows = BUDGET_SCALES[1]
+
+
+class SoftdeskQueryBudget1000Tests(SoftdeskQueryBudgetMixin, TestCase):
+    rows = BUDGET_SCALES[2]
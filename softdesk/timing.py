@@ -0,0 +1,258 @@
+import hashlib
+import json
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+# Opt-in request instrumentation (SOFTDESK_TIMING['ENABLED']). Every request gets a
+# Server-Timing header and a JSON log line on the softdesk.timing logger with its query
+# count, database time, serializer time, view time and total time. The same figures are
+# counted per route in histogram buckets, buffered by each process and added every
+# SOFTDESK_TIMING['FLUSH'] seconds with incr() to the Django cache named by ALIAS, where
+# timing_report and the staff-only timing/ endpoint read their percentiles.
+
+logger = logging.getLogger('softdesk.timing')
+
+PREFIX = 'softdesk:timing'
+ROUTES_KEY = f'{PREFIX}:routes'
+METRICS = ('total', 'view', 'db', 'serializer', 'queries')
+PERCENTILES = (50, 95, 99)
+# bucket 0 holds 0 ms, bucket n > 0 up to GROWTH ** n / 100 ms, MAX_BUCKET everything longer;
+# query counts are their own bucket up to MAX_BUCKET
+GROWTH = 1.1
+MAX_BUCKET = 200
+
+current = ContextVar('softdesk_timing', default=None)
+
+
+def get_settings():
+    return {'ENABLED': False, 'ALIAS': 'default', 'FLUSH': 10, **getattr(settings, 'SOFTDESK_TIMING', {})}
+
+
+class RequestTimings:
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.serializer = 0.0
+        self.serializing = False
+        self.view_start = None
+        self.view_end = None
+
+    def __call__(self, execute, sql, params, many, context):
+        # database execute wrapper
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - start
+            self.queries += 1
+
+
+@contextmanager
+def measure_serializer():
+    # only the outermost serialization of a request counts, nested ones are part of it
+    timings = current.get()
+    if timings is None or timings.serializing:
+        yield
+        return
+    timings.serializing = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.serializer += time.perf_counter() - start
+        timings.serializing = False
+
+
+def serialized(serializer):
+    # serializer.data, counted as serializer time
+    with measure_serializer():
+        return serializer.data
+
+
+def route_of(request):
+    match = getattr(request, 'resolver_match', None)
+    return f"{request.method} /{match.route}" if match is not None else f"{request.method} (unresolved)"
+
+
+def bucket_of(metric, value):
+    if metric == 'queries':
+        return min(value, MAX_BUCKET)
+    if value <= 0:
+        return 0
+    return min(max(math.ceil(math.log(value * 100, GROWTH)), 1), MAX_BUCKET)
+
+
+def bucket_value(metric, bucket):
+    # upper bound of the bucket, in milliseconds or queries
+    if metric == 'queries' or bucket == 0:
+        return bucket
+    return round(GROWTH ** bucket / 100, 2)
+
+
+def percentile(values, rank):
+    # nearest rank
+    values = sorted(values)
+    return values[max(math.ceil(rank / 100 * len(values)) - 1, 0)] if values else 0
+
+
+def histogram_percentile(histogram, rank):
+    # nearest rank over {bucket: count}, as a bucket
+    total = sum(histogram.values())
+    target = max(math.ceil(rank / 100 * total), 1)
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen >= target:
+            return bucket
+    return 0
+
+
+def bucket_key(route, metric, bucket):
+    # routes hold spaces and <>, which memcached keys cannot
+    return f'{PREFIX}:{hashlib.md5(route.encode()).hexdigest()}:{metric}:{bucket}'
+
+
+def route_keys(route):
+    return [bucket_key(route, 'count', 0)] + [
+        bucket_key(route, metric, bucket) for metric in METRICS for bucket in range(MAX_BUCKET + 1)
+    ]
+
+
+class Histograms:
+    # this process's counts since its last flush, {(route, metric, bucket): count}
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        self.flushed_at = time.monotonic()
+
+    def add(self, route, sample):
+        with self.lock:
+            self.counts[route, 'count', 0] += 1
+            for metric, value in zip(METRICS, sample):
+                self.counts[route, metric, bucket_of(metric, value)] += 1
+        if time.monotonic() - self.flushed_at >= get_settings()['FLUSH']:
+            self.flush()
+
+    def flush(self):
+        options = get_settings()
+        with self.lock:
+            counts, self.counts = self.counts, Counter()
+            self.flushed_at = time.monotonic()
+        if not options['ALIAS'] or not counts:
+            return
+        cache = caches[options['ALIAS']]
+        # a route dropped by a concurrent update of the set comes back with its next flush
+        cache.set(ROUTES_KEY, cache.get(ROUTES_KEY, set()) | {route for route, _, _ in counts}, None)
+        for (route, metric, bucket), count in counts.items():
+            key = bucket_key(route, metric, bucket)
+            cache.add(key, 0, None)
+            cache.incr(key, count)
+
+
+histograms = Histograms()
+
+
+def record(route, sample):
+    histograms.add(route, sample)
+
+
+def report():
+    # {route: {'count': n, metric: {'p50': ..., 'p95': ..., 'p99': ...}}}, times in milliseconds
+    # rounded up to their bucket
+    options = get_settings()
+    if not options['ALIAS']:
+        return {}
+    histograms.flush()
+    cache = caches[options['ALIAS']]
+    summary = {}
+    for route in sorted(cache.get(ROUTES_KEY, set())):
+        counts = cache.get_many(route_keys(route))
+        summary[route] = {'count': counts.get(bucket_key(route, 'count', 0), 0)}
+        for metric in METRICS:
+            histogram = {
+                bucket: counts[bucket_key(route, metric, bucket)] for bucket in range(MAX_BUCKET + 1)
+                if bucket_key(route, metric, bucket) in counts
+            }
+            summary[route][metric] = {
+                f'p{rank}': bucket_value(metric, histogram_percentile(histogram, rank)) for rank in PERCENTILES
+            }
+    return summary
+
+
+def reset():
+    options = get_settings()
+    if options['ALIAS']:
+        histograms.flush()
+        cache = caches[options['ALIAS']]
+        keys = [ROUTES_KEY]
+        for route in cache.get(ROUTES_KEY, set()):
+            keys += route_keys(route)
+        cache.delete_many(keys)
+
+
+class TimingMiddleware:
+    # first in MIDDLEWARE, so that total covers every other middleware
+    def __init__(self, get_response):
+        if not get_settings()['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        token = current.set(timings)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings))
+                response = self.get_response(request)
+        finally:
+            current.reset(token)
+        end = time.perf_counter()
+
+        # a DRF view ends where its response is rendered, any other where the response comes back
+        view = ((timings.view_end or end) - timings.view_start) if timings.view_start is not None else 0.0
+        milliseconds = {
+            'total': (end - start) * 1000,
+            'view': view * 1000,
+            'db': timings.db * 1000,
+            'serializer': timings.serializer * 1000,
+        }
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={milliseconds["db"]:.2f};desc="{timings.queries} queries"',
+            f'serializer;dur={milliseconds["serializer"]:.2f}',
+            f'view;dur={milliseconds["view"]:.2f}',
+            f'total;dur={milliseconds["total"]:.2f}',
+        ])
+
+        route = route_of(request)
+        logger.info(json.dumps({
+            'route': route,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': timings.queries,
+            **{f'{name}_ms': round(value, 2) for name, value in milliseconds.items()},
+        }))
+        record(route, tuple(round(milliseconds[metric], 2) for metric in METRICS[:-1]) + (timings.queries,))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = current.get()
+        if timings is not None:
+            timings.view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        timings = current.get()
+        if timings is not None:
+            timings.view_end = time.perf_counter()
+        return response
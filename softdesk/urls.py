@@ -1,13 +1,26 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     path('project/', views.ListProjectsView.as_view({'post': 'create', 'get': 'list'}), name='project-list'),
     path('project/<int:id>/add-contributor/', views.add_contributor, name='add contributor'),
     path('project/<int:id>/remove-contributor/', views.remove_contributor, name='remove contributor'),
+    path('project/<int:id>/add-contributors/', views.add_contributors, name='add contributors'),
+    path('project/<int:id>/remove-contributors/', views.remove_contributors, name='remove contributors'),
     path('project/<int:id>/', views.ProjectView.as_view(), name='retrieve-update-delete-project'),
+    path('project/<int:id>/export/', views.export_project, name='export-project'),
+    path('project/<int:id>/stats/', views.project_stats, name='project-stats'),
     path('project/<int:project_id>/create-issue/', views.CreateIssueView.as_view(), name='create-issue'),
+    path('project/<int:project_id>/issues/', views.BulkIssueView.as_view(), name='bulk-issues'),
     path('issue/<int:issue_id>/', views.IssueView.as_view(), name='retrieve-update-delete-issue'),
     path('issue/<int:issue_id>/create-comment/', views.CreateCommentView.as_view(), name='comment-create'),
     path('comment/<int:id>/', views.CommentView.as_view(), name='retrieve-update-delete-comment'),
+    path('search/', views.search, name='search'),
+    path('timing/', views.timing_report, name='timing-report'),
+
+    # async read paths, for ASGI servers
+    path('async/project/', async_views.project_list, name='async-project-list'),
+    path('async/project/<int:id>/', async_views.project_detail, name='async-project-detail'),
+    path('async/issue/<int:issue_id>/', async_views.issue_detail, name='async-issue-detail'),
+    path('async/comment/<int:id>/', async_views.comment_detail, name='async-comment-detail'),
 ]
@@ -1,20 +1,95 @@
+from datetime import datetime, time
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Max, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from rest_framework.response import Response
-from rest_framework.generics import CreateAPIView, RetrieveUpdateDestroyAPIView
+from rest_framework.generics import CreateAPIView, GenericAPIView, RetrieveUpdateDestroyAPIView
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework.viewsets import ReadOnlyModelViewSet
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from accounts.models import User
 from .models import Comment, Issue, Project, ProjectContributor
-from .paginations import CustomPagination
+from . import caching, fastpath
+from . import search as full_text
+from . import stats, timing
+from .conditional import is_conditional, not_modified, set_validators, touch_issue, touch_project
+from .exports import csv_lines, ndjson_lines
+from .memberships import forget_memberships, is_contributor
+from .paginations import CustomPagination, PaginationModeMixin
 from .permissions import IsContributor
-from .serializers import AddContributorSerializer, CommentSerializer, IssueListSerializer, IssueSerializer, ProjectDetailSerializer, ProjectListSerializer, ProjectSerializer, RemoveContributorSerializer
+from .replicas import replica_reads
+from .serializers import AddContributorSerializer, BatchIssueUpdateSerializer, BulkContributorsSerializer, BulkIssueSerializer, CommentSerializer, IssueListSerializer, IssueSerializer, ProjectDetailSerializer, ProjectListSerializer, ProjectSerializer, RemoveContributorSerializer
 
 # Create your views here.
 
+def parse_created_at(params, name):
+    # ?created_after=2024-01-31 or a full ISO 8601 datetime
+    value = params[name]
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None and parse_date(value) is not None:
+            parsed = datetime.combine(parse_date(value), time.min)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: "Enter a valid date or datetime."})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def filter_projects(queryset, user, params):
+    # only the projects the user contributes to, through the (contributor, project) index
+    queryset = queryset.filter(projectcontributor__contributor=user).order_by('created_at', 'id')
+    if params.get('project_type'):
+        queryset = queryset.filter(project_type=params['project_type'])
+    if params.get('creator'):
+        queryset = queryset.filter(creator__username=params['creator'])
+    if params.get('created_after'):
+        queryset = queryset.filter(created_at__gte=parse_created_at(params, 'created_after'))
+    if params.get('created_before'):
+        queryset = queryset.filter(created_at__lte=parse_created_at(params, 'created_before'))
+    return queryset
+
+
+def serialize_page(view, queryset, serializer_class, compiled):
+    # the current page of a list, built from values() rows when the request allows it
+    if fastpath.applies(view.request):
+        return compiled.render(view.paginate_queryset(compiled.values(queryset)))
+    page = view.paginate_queryset(queryset)
+    return timing.serialized(serializer_class(page, many=True, context=view.get_serializer_context()))
+
+
+def count_subquery(queryset, field):
+    # COUNT() of the rows of queryset pointing at the outer row through field, as a correlated
+    # subquery: unlike joins, several of them in one SELECT never multiply each other's rows
+    rows = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field)
+    return Coalesce(Subquery(rows.annotate(count=Count('pk')).values('count')), 0)
+
+
+def annotate_project_counts(queryset):
+    # contributor_count and open_issue_count of ProjectListSerializer
+    return queryset.annotate(
+        contributor_count=count_subquery(ProjectContributor.objects.all(), 'project'),
+        open_issue_count=count_subquery(Issue.objects.exclude(status='finished'), 'project'),
+    )
+
+
+def annotate_issue_counts(queryset):
+    # comment_count of IssueListSerializer, the counter the stats triggers keep in softdesk_issuestat
+    return queryset.annotate(comment_count=Coalesce(F('issuestat__comment_count'), 0))
+
+
 class CustomListProjectsViewMixin:
     @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
     def create(self, request):
@@ -22,16 +97,49 @@ class CustomListProjectsViewMixin:
         if serializer.is_valid():
             project = serializer.save(creator=request.user)
             ProjectContributor.objects.create(project=project, contributor=request.user)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            forget_memberships(request, request.user.id)
+            caching.invalidate(caching.PROJECT_LIST)
+            return Response(timing.serialized(serializer), status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 @permission_classes([IsAuthenticated])
 class ListProjectsView(CustomListProjectsViewMixin, ReadOnlyModelViewSet):
-    queryset = Project.objects.all()
+    queryset = Project.objects.select_related('creator')
     serializer_class = ProjectListSerializer
     pagination_class = CustomPagination
 
+    def get_queryset(self):
+        return filter_projects(super().get_queryset(), self.request.user, self.request.query_params)
+
+    def page_response(self):
+        # counted and loaded (?fields=) for the rows of the page only
+        queryset = ProjectListSerializer.defer_unrequested(
+            self.filter_queryset(self.get_queryset()), self.request, 'project'
+        )
+        data = serialize_page(self, annotate_project_counts(queryset), ProjectListSerializer, fastpath.PROJECT_LIST)
+        return self.get_paginated_response(data)
+
+    @replica_reads
+    def list(self, request, *args, **kwargs):
+        # the newest update and the row count change whenever a listed project changes or goes away
+        queryset = self.filter_queryset(self.get_queryset())
+        state = queryset.aggregate(updated_at=Max('updated_at'), count=Count('id'))
+        if state['updated_at'] is None:
+            return self.page_response()
+
+        # the count makes deletions, which do not move the newest update, change the ETag too
+        response = not_modified(request, state['updated_at'], state['count'])
+        if response is None:
+            cache_state = f"{state['updated_at'].isoformat()}:{state['count']}"
+            key, data = caching.lookup(request, caching.PROJECT_LIST, per_user=True, state=cache_state)
+            if data is None:
+                response = self.page_response()
+                caching.store(key, response.data)
+            else:
+                response = Response(data)
+        return set_validators(request, response, state['updated_at'], state['count'])
+
 
 @swagger_auto_schema(methods=['POST'], request_body=AddContributorSerializer)
 @api_view(['POST'])
@@ -52,12 +160,16 @@ def add_contributor(request, id):
                 "message": "user not found"
             }, status=status.HTTP_404_NOT_FOUND)
 
-        if ProjectContributor.objects.filter(project=project, contributor=contributor).exists():
+        # the unique constraint on (project, contributor) rejects duplicates
+        try:
+            with transaction.atomic():
+                ProjectContributor.objects.create(project=project, contributor=contributor)
+        except IntegrityError:
             return Response({
                 "message": f"{contributor} is already a contributor to this project"
             }, status=status.HTTP_400_BAD_REQUEST)
-
-        ProjectContributor.objects.create(project=project, contributor=contributor)
+        forget_memberships(request, contributor.id)
+        touch_project(project.id)
         return Response({
             "message": f"{contributor} added as a contributor to this project successfully"
         }, status=status.HTTP_201_CREATED)
@@ -87,6 +199,8 @@ def remove_contributor(request, id):
                 }, status=status.HTTP_400_BAD_REQUEST)
             else:
                 contributor.delete()
+                forget_memberships(request, contributor.contributor_id)
+                touch_project(project.id)
                 return Response({
                     "message": f"{request.data['username']} has been removed from the project"
                 }, status=status.HTTP_204_NO_CONTENT)
@@ -99,17 +213,164 @@ def remove_contributor(request, id):
         }, status=status.HTTP_403_FORBIDDEN)
 
 
-class ProjectView(RetrieveUpdateDestroyAPIView):
-    queryset = Project.objects.all()
+@swagger_auto_schema(methods=['POST'], request_body=BulkContributorsSerializer)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def add_contributors(request, id):
+    serializer = BulkContributorsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    usernames = list(dict.fromkeys(serializer.validated_data['usernames']))
+
+    try:
+        project = Project.objects.get(id=id)
+    except Project.DoesNotExist:
+        return Response({
+            "message": "Project does not exist"
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    if project.creator_id != request.user.id:
+        return Response({
+            "detail": "You do not have permission to add contributors to this project!"
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    # one IN query for the users, one for those already contributing, one insert
+    user_ids = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+    existing = set(ProjectContributor.objects.filter(
+        project=project, contributor_id__in=user_ids.values()
+    ).values_list('contributor_id', flat=True))
+
+    results = {}
+    new_ids = []
+    for username in usernames:
+        if username not in user_ids:
+            results[username] = "user not found"
+        elif user_ids[username] in existing:
+            results[username] = "already a contributor"
+        else:
+            results[username] = "added"
+            new_ids.append(user_ids[username])
+
+    ProjectContributor.objects.bulk_create(
+        [ProjectContributor(project=project, contributor_id=user_id) for user_id in new_ids],
+        ignore_conflicts=True,
+    )
+    if new_ids:
+        forget_memberships(request, *new_ids)
+        touch_project(project.id)
+    return Response({"results": results}, status=status.HTTP_200_OK)
+
+
+@swagger_auto_schema(methods=['DELETE'], request_body=BulkContributorsSerializer)
+@api_view(['DELETE'])
+@permission_classes([IsAuthenticated])
+def remove_contributors(request, id):
+    serializer = BulkContributorsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    usernames = list(dict.fromkeys(serializer.validated_data['usernames']))
+
+    try:
+        project = Project.objects.get(pk=id)
+    except Project.DoesNotExist:
+        return Response({
+            "message": "Project does not exist"
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    if project.creator_id != request.user.id:
+        return Response({
+            "detail": "You do not have permission to remove project contributors!"
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    # username -> (ProjectContributor id, user id), in a single joined IN query
+    contributors = {
+        username: (pk, user_id)
+        for pk, username, user_id in ProjectContributor.objects.filter(
+            project=project, contributor__username__in=usernames
+        ).values_list('id', 'contributor__username', 'contributor_id')
+    }
+
+    results = {}
+    removed = {}
+    for username in usernames:
+        if username not in contributors:
+            results[username] = "not a contributor"
+        elif contributors[username][1] == project.creator_id:
+            results[username] = "project creator cannot be removed"
+        else:
+            results[username] = "removed"
+            removed[contributors[username][0]] = contributors[username][1]
+
+    if removed:
+        ProjectContributor.objects.filter(id__in=removed.keys()).delete()
+        forget_memberships(request, *removed.values())
+        touch_project(project.id)
+    return Response({"results": results}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_project(request, id):
+    # ?output=ndjson (default, comments nested in their issue), ?output=ndjson&flat=1 or ?output=csv
+    # (one row per comment). Rows are streamed from server-side cursors as they are read.
+    output = request.query_params.get('output', 'ndjson')
+    if output not in ('ndjson', 'csv'):
+        return Response({
+            "message": "output must be 'ndjson' or 'csv'"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if not Project.objects.filter(id=id).exists():
+        return Response({
+            "message": "Project does not exist"
+        }, status=status.HTTP_404_NOT_FOUND)
+    if not is_contributor(request, id):
+        return Response({
+            "detail": "You do not have permission to export this project !"
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    if output == 'csv':
+        response = StreamingHttpResponse(csv_lines(id), content_type='text/csv')
+    else:
+        flat = request.query_params.get('flat') in ('1', 'true')
+        response = StreamingHttpResponse(ndjson_lines(id, flat=flat), content_type='application/x-ndjson')
+    response['Content-Disposition'] = f'attachment; filename="project-{id}.{output}"'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def project_stats(request, id):
+    # issue counts by status, priority and tag and comment totals, read from counters
+    if not Project.objects.filter(id=id).exists():
+        return Response({
+            "message": "Project does not exist"
+        }, status=status.HTTP_404_NOT_FOUND)
+    if not is_contributor(request, id):
+        return Response({
+            "detail": "You do not have permission to view the stats of this project !"
+        }, status=status.HTTP_403_FORBIDDEN)
+    return Response(stats.project_stats(id), status=status.HTTP_200_OK)
+
+
+class ProjectView(PaginationModeMixin, RetrieveUpdateDestroyAPIView):
+    # creator and contributors are loaded up front so the detail serializer never hits the db per row
+    queryset = Project.objects.select_related('creator').prefetch_related(
+        Prefetch('projectcontributor_set', queryset=ProjectContributor.objects.select_related('contributor'))
+    )
     serializer_class = ProjectDetailSerializer
     lookup_field = 'id'
     permission_classes = [IsAuthenticated, IsContributor]
     pagination_class = CustomPagination
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method != 'GET':
+            return queryset
+        return ProjectDetailSerializer.defer_unrequested(queryset, self.request, 'project')
+
     def destroy(self, request, *args, **kwargs):
         project = self.get_object()
         if project.creator == request.user:
             project.delete()
+            caching.invalidate_project(kwargs['id'])
             return Response({
                 "detail": "Project successfully deleted"
             }, status=status.HTTP_204_NO_CONTENT)
@@ -123,6 +384,7 @@ class ProjectView(RetrieveUpdateDestroyAPIView):
             serializer = self.get_serializer(project, data=request.data, partial=True)
             if serializer.is_valid():
                 serializer.save()
+                caching.invalidate_project(project.id)
                 return Response({"detail": "Project successfully updated"}, status=status.HTTP_200_OK)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         else:
@@ -130,19 +392,37 @@ class ProjectView(RetrieveUpdateDestroyAPIView):
                 "detail": "You do not have permission to update this project !"
                 }, status=status.HTTP_403_FORBIDDEN)
 
+    @replica_reads
     def retrieve(self, request, *args, **kwargs):
+        # contributors share the cached pages of a project, the membership check stays per user;
+        # the update time in the key keeps every worker from serving a page older than the project
+        key = None
+        updated_at = Project.objects.filter(id=kwargs['id']).values_list('updated_at', flat=True).first()
+        if updated_at is not None and is_contributor(request, kwargs['id']):
+            if is_conditional(request):
+                # answer a fresh client copy before loading contributors and issues
+                response = not_modified(request, updated_at)
+                if response is not None:
+                    return response
+            key, cached = caching.lookup(request, caching.project_scope(kwargs['id']), state=updated_at.isoformat())
+            if cached is not None:
+                return set_validators(request, Response(cached['data']), cached['updated_at'])
+
         instance = self.get_object()
         serializer = self.get_serializer(instance)
-        issues = instance.issue_set.all()
+        issues = IssueListSerializer.defer_unrequested(
+            instance.issue_set.select_related('creator', 'assigned_to'), request, 'project'
+        )
+        issues = annotate_issue_counts(issues)
 
         # Use pagination to paginate issues and add them to 'project_details'
-        page = self.paginate_queryset(issues)
-        if page is not None:
-            issue_serializer = IssueListSerializer(page, many=True)
-            return self.get_paginated_response({
-                'project_details': serializer.data,
-                'project_issues': issue_serializer.data,
+        if self.paginator is not None:
+            response = self.get_paginated_response({
+                'project_details': timing.serialized(serializer),
+                'project_issues': serialize_page(self, issues, IssueListSerializer, fastpath.ISSUE_LIST),
             })
+            caching.store(key, {'data': response.data, 'updated_at': instance.updated_at})
+            return set_validators(request, response, instance.updated_at)
 
 
 class CreateIssueView(CreateAPIView):
@@ -157,7 +437,7 @@ class CreateIssueView(CreateAPIView):
             return Response({"message": "Project not found"}, status=status.HTTP_404_NOT_FOUND)
 
         # control if user is a contributor of Project
-        if not ProjectContributor.objects.filter(project=project, contributor=request.user).exists():
+        if not is_contributor(request, project.id):
             return Response({"message": "You are not a contributor to this project"},
                             status=status.HTTP_403_FORBIDDEN)
 
@@ -185,14 +465,84 @@ class CreateIssueView(CreateAPIView):
             # Set the assigned_to field to the Contributor instance
             serializer.validated_data['assigned_to'] = contributor.contributor
             serializer.save(creator=request.user, project=project)
+            touch_project(project.id)
 
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            return Response(timing.serialized(serializer), status=status.HTTP_201_CREATED)
         return Response({
             "message": "Issue must be assigned to a project contributor"
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
-class IssueView(RetrieveUpdateDestroyAPIView):
+class BulkIssueView(GenericAPIView):
+    # POST creates many issues of a project, PATCH moves many of them to a new status/priority
+    serializer_class = BulkIssueSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_project(self):
+        try:
+            project = Project.objects.get(id=self.kwargs.get('project_id'))
+        except Project.DoesNotExist:
+            return None, Response({"message": "Project not found"}, status=status.HTTP_404_NOT_FOUND)
+        if not is_contributor(self.request, project.id):
+            return None, Response({"message": "You are not a contributor to this project"},
+                                  status=status.HTTP_403_FORBIDDEN)
+        return project, None
+
+    def post(self, request, *args, **kwargs):
+        project, error = self.get_project()
+        if error:
+            return error
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        issues_data = serializer.validated_data['issues']
+
+        # resolve every assignee, and check they contribute to the project, in one query
+        usernames = {data.get('assigned_to') for data in issues_data if data.get('assigned_to')}
+        assignees = {
+            user.username: user
+            for user in User.objects.filter(projectcontributor__project=project, username__in=usernames)
+        }
+
+        errors = {}
+        for index, data in enumerate(issues_data):
+            if not data.get('assigned_to'):
+                errors[index] = "Issue must be assigned to a project contributor"
+            elif data['assigned_to'] not in assignees:
+                errors[index] = "The specified user is not a contributor to this project"
+        if errors:
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        issues = [
+            Issue(**dict(data, assigned_to=assignees[data['assigned_to']]), creator=request.user, project=project)
+            for data in issues_data
+        ]
+        with transaction.atomic():
+            issues = Issue.objects.bulk_create(issues)
+            touch_project(project.id)
+
+        return Response(timing.serialized(IssueSerializer(issues, many=True)), status=status.HTTP_201_CREATED)
+
+    @swagger_auto_schema(request_body=BatchIssueUpdateSerializer)
+    def patch(self, request, *args, **kwargs):
+        project, error = self.get_project()
+        if error:
+            return error
+
+        serializer = BatchIssueUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        changes = {field: value for field, value in serializer.validated_data.items() if field != 'ids'}
+
+        # only the creator of an issue may update it, as in IssueView.update
+        updated = Issue.objects.filter(
+            project=project, creator=request.user, id__in=serializer.validated_data['ids']
+        ).update(updated_at=timezone.now(), **changes)
+        if updated:
+            touch_project(project.id)
+        return Response({"updated": updated}, status=status.HTTP_200_OK)
+
+
+class IssueView(PaginationModeMixin, RetrieveUpdateDestroyAPIView):
     serializer_class = IssueListSerializer
     queryset = Issue.objects.all()
     permission_classes = [IsAuthenticated, IsContributor]
@@ -202,8 +552,11 @@ class IssueView(RetrieveUpdateDestroyAPIView):
         # to config and select id of issue
         issue_id = self.kwargs.get('issue_id')
         try:
-            issue = Issue.objects.get(id=issue_id)
-            if ProjectContributor.objects.filter(project=issue.project, contributor=self.request.user).exists():
+            issues = annotate_issue_counts(Issue.objects.all())
+            if self.request.method == 'GET':
+                issues = IssueListSerializer.defer_unrequested(issues, self.request, 'issue')
+            issue = issues.get(id=issue_id)
+            if is_contributor(self.request, issue.project_id):
                 return issue
             else:
                 return Response({
@@ -213,25 +566,35 @@ class IssueView(RetrieveUpdateDestroyAPIView):
         except Issue.DoesNotExist:
             return Response({"message": "Issue not found"}, status=status.HTTP_404_NOT_FOUND)
 
+    @replica_reads
     def retrieve(self, request, *args, **kwargs):
+        if is_conditional(request):
+            # answer a fresh client copy before loading the issue and its comments
+            issue = Issue.objects.filter(id=kwargs['issue_id']).values('updated_at', 'project_id').first()
+            if issue is not None and is_contributor(request, issue['project_id']):
+                response = not_modified(request, issue['updated_at'])
+                if response is not None:
+                    return response
+
         instance = self.get_object()
         serializer = self.get_serializer(instance)
 
         # get Comment to Issue
-        comments = Comment.objects.filter(issue=instance)
+        comments = CommentSerializer.defer_unrequested(
+            Comment.objects.filter(issue=instance).select_related('creator'), request, 'issue'
+        )
 
         # Use pagination to paginate Comment
-        page = self.paginate_queryset(comments)
-        if page is not None:
-            comment_serializer = CommentSerializer(page, many=True)
+        if self.paginator is not None:
             # Return issue details and paginated list of comments
-            return self.get_paginated_response({
-                'issue_details': serializer.data,
-                'issue_comments': comment_serializer.data,
+            response = self.get_paginated_response({
+                'issue_details': timing.serialized(serializer),
+                'issue_comments': serialize_page(self, comments, CommentSerializer, fastpath.COMMENT_LIST),
             })
+            return set_validators(request, response, instance.updated_at)
 
         return Response({
-            'issue_details': serializer.data,
+            'issue_details': timing.serialized(serializer),
             'issue_comments': [],
         })
 
@@ -245,7 +608,7 @@ class IssueView(RetrieveUpdateDestroyAPIView):
                 assigned_to_username = request.data.get('assigned_to')
 
                 if assigned_to_username is not None:
-                    if not ProjectContributor.objects.filter(project=project, contributor=request.user).exists():
+                    if not is_contributor(request, project.id):
                         return Response({
                             "message": "You are not a contributor to this project"
                         }, status=status.HTTP_403_FORBIDDEN)
@@ -268,7 +631,8 @@ class IssueView(RetrieveUpdateDestroyAPIView):
                     else:
                         serializer.validated_data['assigned_to'] = None
                 serializer.save()
-                return Response(serializer.data, status=status.HTTP_200_OK)
+                touch_project(project.id)
+                return Response(timing.serialized(serializer), status=status.HTTP_200_OK)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         return Response({
             "detail": "You do not have permission to update this issue!"
@@ -278,6 +642,7 @@ class IssueView(RetrieveUpdateDestroyAPIView):
         issue = self.get_object()
         if issue.creator == request.user:
             issue.delete()
+            touch_project(issue.project_id)
             return Response({"detail": "Issue successfully deleted"}, status=status.HTTP_204_NO_CONTENT)
         return Response({
             "detail": "You do not have permission to delete this issue !"
@@ -298,9 +663,11 @@ class CreateCommentView(CreateAPIView):
             return Response({"message": "Issue not found"}, status=status.HTTP_404_NOT_FOUND)
 
         # check if user is contributor to project
-        project = issue.project
-        if ProjectContributor.objects.filter(project=project, contributor=user).exists():
+        if is_contributor(self.request, issue.project_id):
             serializer.save(creator=user, issue=issue)
+            touch_issue(issue.id)
+            # the project detail page shows the comment count of its issues
+            touch_project(issue.project_id)
         else:
             return Response({
                 "message": "You are not a contributor to this project and cannot create a comment"
@@ -308,19 +675,33 @@ class CreateCommentView(CreateAPIView):
 
 
 class CommentView(RetrieveUpdateDestroyAPIView):
-    queryset = Comment.objects.all()
+    queryset = Comment.objects.select_related('issue')
     lookup_field = 'id'
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticated]
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method != 'GET':
+            return queryset
+        return CommentSerializer.defer_unrequested(queryset, self.request, 'comment')
 
+
+    @replica_reads
     def retrieve(self, request, *args, **kwargs):
+        if is_conditional(request):
+            # answer a fresh client copy before loading and serializing the comment
+            comment = Comment.objects.filter(id=kwargs['id']).values('updated_at', 'issue__project_id').first()
+            if comment is not None and is_contributor(request, comment['issue__project_id']):
+                response = not_modified(request, comment['updated_at'])
+                if response is not None:
+                    return response
+
         comment = self.get_object()
         # check if user is contributor to project
-        project = comment.issue.project
-        if ProjectContributor.objects.filter(project=project, contributor=self.request.user).exists():
+        if is_contributor(self.request, comment.issue.project_id):
             serializer = self.get_serializer(comment)
-            return Response(serializer.data)
+            return set_validators(request, Response(timing.serialized(serializer)), comment.updated_at)
         else:
             return Response({
                 "detail": "You do not have permission to view this comment !"
@@ -331,7 +712,9 @@ class CommentView(RetrieveUpdateDestroyAPIView):
         comment = self.get_object()
         serializer = self.get_serializer(comment, data=request.data, partial=True)
         if comment.creator == request.user:
+            serializer.is_valid(raise_exception=True)
             serializer.save()
+            touch_issue(comment.issue_id)
             return Response({
                 "message": "Comment successfully updated"
             }, status=status.HTTP_200_OK)
@@ -344,8 +727,44 @@ class CommentView(RetrieveUpdateDestroyAPIView):
         comment = self.get_object()
         if comment.creator == request.user:
             comment.delete()
+            touch_issue(comment.issue_id)
+            touch_project(comment.issue.project_id)
             return Response({"message": "Comment successfully deleted"}, status=status.HTTP_204_NO_CONTENT)
         else:
             return Response({
                 "message": "You do not have permission to delete this comment !"
-            }, status=status.HTTP_403_FORBIDDEN)
\ No newline at end of file
+            }, status=status.HTTP_403_FORBIDDEN)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search(request):
+    # ?q=<words> ranked issues and comments of the user's projects, ?page=&page_size= to paginate
+    if not full_text.is_available():
+        return Response({"message": f"Full-text search is not available on {connection.vendor}"},
+                        status=status.HTTP_501_NOT_IMPLEMENTED)
+    terms = request.query_params.get('q', '')
+    try:
+        page = max(int(request.query_params.get('page', 1)), 1)
+        page_size = min(max(int(request.query_params.get('page_size', CustomPagination.page_size)), 1),
+                        CustomPagination.max_page_size)
+    except ValueError:
+        return Response({"message": "page and page_size must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+    # one extra row tells whether there is a next page without counting every match
+    results = full_text.search(request.user.id, terms, page_size + 1, (page - 1) * page_size)
+    url = request.build_absolute_uri()
+    return Response({
+        'next': replace_query_param(url, 'page', page + 1) if len(results) > page_size else None,
+        'previous': None if page == 1 else (
+            remove_query_param(url, 'page') if page == 2 else replace_query_param(url, 'page', page - 1)
+        ),
+        'results': results[:page_size],
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def timing_report(request):
+    # per-route p50/p95/p99 of the requests sampled by TimingMiddleware, staff only
+    return Response(timing.report(), status=status.HTTP_200_OK)